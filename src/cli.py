@@ -0,0 +1,131 @@
+"""
+collusion: one command for every stage.
+
+    python -m src.cli <stage> [options]      (or: make cli ARGS="<stage> ...")
+
+Only argparse is imported at startup. Each stage imports its own modules, and with
+them its heavy dependencies (TensorFlow for train, plotly for plots), when it runs.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+
+def _simulate(args):
+    from src.simulation.run_dgp0 import main
+    main(workers=args.workers)
+
+
+def _windows(args):
+    from src.simulation.windows.run_window import main
+    main()
+
+
+def _features(args):
+    from src.data.run_feature import main
+    main()
+
+
+def _train(args):
+    from src.model.train_ae import main
+    main()
+
+
+def _sweep(args):
+    from src.model.run_sweep import main
+    main(workers=args.workers, resume=not args.no_resume)
+
+
+def _sampling(args):
+    from src.model.run_sampling_bench import main
+    main(strides=args.strides, mode=args.mode, L=args.L)
+
+
+def _score(args):
+    from src.scoring.run_scoring import main
+    main()
+
+
+def _real(args):
+    from src.data.data_orchestrator import main
+    main(workers=args.workers, full=args.full)
+
+
+def _pipeline(args):
+    from src.run_pipeline import main
+    main(force=args.force, dry_run=args.dry_run)
+
+
+def _parity(args):
+    from src.simulation.run_parity import main
+    main()
+
+
+def _screen(args):
+    from src.screening.run_screen import main
+    main()
+
+
+def _evaluate(args):
+    from src.simulation.run_evaluation import main
+    main()
+
+
+def _plots(args):
+    from src.plots.run_plots_baseline import main
+    main()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="collusion", description="Collusion detection pipeline stages.")
+    sub = parser.add_subparsers(dest="stage", required=True, metavar="<stage>")
+
+    p = sub.add_parser("simulate", help="simulate Tier 0 panels for every stress test mode")
+    p.add_argument("--workers", type=int, default=None, help="processes for the sharded engine (default: config)")
+    p.set_defaults(run=_simulate)
+
+    sub.add_parser("windows", help="build windows_L{L}.parquet for every mode").set_defaults(run=_windows)
+    sub.add_parser("features", help="featurize every mode with the configured engine").set_defaults(run=_features)
+    sub.add_parser("train", help="train the autoencoder (needs tensorflow, scikit-learn)").set_defaults(run=_train)
+
+    p = sub.add_parser("sweep", help="train every (mode, L, seed, hidden_dims) of the sweep config")
+    p.add_argument("--workers", type=int, default=None, help="training processes (default: sweep.workers or cpus / threads)")
+    p.add_argument("--no-resume", action="store_true", help="retrain jobs whose artifacts already exist")
+    p.set_defaults(run=_sweep)
+
+    p = sub.add_parser("sampling", help="training time and A6 separation against the window stride")
+    p.add_argument("--strides", type=int, nargs="+", default=[1, 2, 4, 8, 18], help="window start strides to compare")
+    p.add_argument("--mode", default="calm_fundamentals", help="stress test mode to train and evaluate on")
+    p.add_argument("--L", type=int, default=18, help="window length")
+    p.set_defaults(run=_sampling)
+
+    sub.add_parser("score", help="score features with the NumPy encoder bundle").set_defaults(run=_score)
+
+    p = sub.add_parser("real", help="ingest, featurize and score the raw real-data files")
+    p.add_argument("--workers", type=int, default=1, help="processes running the per-file ingestion chains")
+    p.add_argument("--full", action="store_true", help="reprocess every file instead of only new data")
+    p.set_defaults(run=_real)
+
+    p = sub.add_parser("pipeline", help="run the synthetic DAG, skipping unchanged stages")
+    p.add_argument("--force", action="store_true", help="rerun every stage")
+    p.add_argument("--dry-run", action="store_true", help="only report which stages would run")
+    p.set_defaults(run=_pipeline)
+
+    sub.add_parser("parity", help="check fast kernels against their reference versions").set_defaults(run=_parity)
+    sub.add_parser("screen", help="screen real-data markets from real_scored_L18").set_defaults(run=_screen)
+    sub.add_parser("evaluate", help="A6 separation of the scored calm_fundamentals run").set_defaults(run=_evaluate)
+    sub.add_parser("plots", help="baseline diagnostic plots (needs plotly)").set_defaults(run=_plots)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
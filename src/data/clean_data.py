@@ -1,5 +1,7 @@
+import numpy as np
 import pandas as pd
 import pickle
+import pyarrow as pa
 from pathlib import Path
 
 
@@ -27,9 +29,44 @@ def storing_data(data_dict: dict, filename: str = "clean_data.pkl") -> Path:
         return file_path
 
 
-def storing_data_merged(data: pd.DataFrame, filename: str = "processed_data.csv") -> Path:
+def storing_data_merged(data: pd.DataFrame, filename: str = "processed_data.csv", append: bool = False) -> Path:
 
         DATA_DIR_2.mkdir(parents=True, exist_ok=True)
         file_path = DATA_DIR_2 / filename
-        data.to_csv(file_path, index=False)
-        return file_path
\ No newline at end of file
+        if append and file_path.exists():
+            data.to_csv(file_path, index=False, mode="a", header=False)
+        else:
+            data.to_csv(file_path, index=False)
+        return file_path
+
+
+def series_table(data_dict: dict) -> pa.Table:
+    """
+    Long (product, row, value) table of a {product: Series} dict, sorted by product
+    then original row label. Non-numeric values become NaN.
+    """
+    names = list(data_dict)
+    cols = [pd.to_numeric(data_dict[name], errors="coerce") for name in names]
+    lengths = [len(c) for c in cols]
+    codes = np.repeat(np.arange(len(names), dtype=np.int32), lengths)
+
+    return pa.table({
+        "product": pa.DictionaryArray.from_arrays(codes, pa.array(names, type=pa.string())),
+        "row": np.concatenate([np.asarray(c.index, dtype=np.int64) for c in cols]) if cols else np.empty(0, np.int64),
+        "value": np.concatenate([c.to_numpy(dtype=np.float64) for c in cols]) if cols else np.empty(0),
+    })
+
+
+def storing_series(data_dict: dict, filename: str = "clean_data.arrow") -> Path:
+    """
+    Store cleaned series as one uncompressed Arrow IPC file in data/interim.
+
+    Uncompressed IPC can be memory-mapped, so readers select products without
+    deserializing the whole file (see load_data.read_series).
+    """
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    file_path = DATA_DIR / filename
+    table = series_table(data_dict)
+    with pa.OSFile(str(file_path), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return file_path
@@ -1,9 +1,9 @@
+import argparse
 import pandas as pd 
 import sys
 from pathlib import Path
 import numpy as np
-import joblib
-from tensorflow import keras
+import pyarrow as pa
 
 
 
@@ -12,77 +12,131 @@ PROJECT_ROOT = Path(__file__).resolve().parents[2]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.append(str(PROJECT_ROOT))
 
-from src.data.load_data import file_names, load_data, load_pickle, file_names_cleaned
-from src.data.clean_data import missing_observation, storing_data, storing_data_merged
+from src.data.load_data import DATA_DIR, file_names, load_data
+from src.data.clean_data import missing_observation, storing_series, storing_data_merged
 from src.data.feature_eng import feature_eng_syn
-from src.scoring.conduct_axis import score_centered
-
-def main():
-
-    #loading and cleaning dataset
-    dataset_names = file_names()
-
-    for file in dataset_names:
-        # load dataset
-        df = load_data(file)
-        # store dataset
-        save_file = file.replace(".csv", "")
-        storing_data(missing_observation(df), f"{save_file}.pkl")
-
-    #creating rolling windows and feature eng
-    interim_names = file_names_cleaned()
-
-    #empty list of dfs
-    dfs = []
-
-    for names in interim_names:
-        dfs.append(load_pickle(names))
-
-    #mergining dfs
-    merged_df = pd.concat(dfs, ignore_index=True)
-
-    feature_df = feature_eng_syn(merged_df)
-
-    storing_data_merged(feature_df, "real_processed_18.csv")
-
-    FEATURES_5 = ["volatility", "zero_change_fraction", "max_abs_ret", "AR_1", "price_range"]
-
-    # ---- paths to baseline artifacts ----
-    L = 18
-    seed = 42
-    baseline_dir = PROJECT_ROOT / "runs" / "dgp0" / f"seed_{seed}" / "baseline"
-
-    scaler = joblib.load(baseline_dir / "model" / f"scaler_L{L}.pkl")
-    encoder = keras.models.load_model(baseline_dir / "model" / f"encoder_L{L}.keras")
-
-    mu_C = np.load(baseline_dir / "scoring" / f"mu_C_L{L}.npy")
-    v_hat = np.load(baseline_dir / "scoring" / f"v_hat_L{L}.npy")
+from src.data.feature_registry import FEATURES_5
+from src.data.ragged_windows import RaggedSeries
+from src.data.refresh import (
+    hash_files, incremental_base, read_refresh_manifest, refresh_manifest_path, stale_files, write_refresh_manifest,
+)
+from src.utils.parquet_io import map_chunks, write_dataset_part
+from src.scoring.numpy_scorer import NumpyScorer
+from src.utils.config import load_tier0_config
+from src.utils.schema import apply_dtype_policy, dtype_policy_from_config
+
+# source files the stored real-data rows depend on; editing one forces a full refresh
+REAL_CODE = [
+    "src/data/data_orchestrator.py", "src/data/load_data.py", "src/data/clean_data.py", "src/data/ragged_windows.py",
+    "src/data/feature_eng.py", "src/data/feature_registry.py", "src/scoring/numpy_scorer.py", "src/utils/schema.py",
+]
+
+def ingest_file(file: str, window: int = 18, after: dict | None = None) -> tuple:
+    """
+    Load -> clean -> store interim -> window -> feature chain of one raw file.
+
+    Returns the file's feature table (Name as plain strings, so tables of different
+    files concatenate without unifying categories) and the last row label of each
+    product. With `after` ({product: row label}) only windows ending after it are
+    featurized.
+    """
+    df = load_data(file)
+    # store dataset (the first column is the date)
+    cleaned = missing_observation(df.iloc[:, 1:])
+    storing_series(cleaned, f"{Path(file).stem}.arrow")
+
+    series = RaggedSeries.from_dict(cleaned)
+    features = feature_eng_syn(series.window_frame(window, after))
+    features["Name"] = features["Name"].astype(str)
+    return pa.Table.from_pandas(features, preserve_index=False), series.last_rows()
+
+
+def _ingest_task(task: tuple) -> tuple:
+    return ingest_file(*task)
+
+
+def ingest(files, window: int = 18, workers: int = 1, after: dict | None = None) -> tuple:
+    """
+    Feature table of every raw file, merged with one Arrow concat, and the last row
+    label of each product per file.
+
+    workers > 1 runs the per-file chains in a process pool; the result is the same
+    for any number of workers (files are merged in input order). `after` maps a file
+    to the {product: row label} already processed for it.
+    """
+    after = after or {}
+    tasks = [(file, window, after.get(file)) for file in files]
+    results = list(map_chunks(_ingest_task, tasks, workers, processes=True))
+    merged = pa.concat_tables([table for table, _ in results], promote_options="default").to_pandas()
+    return merged, {file: last for file, (_, last) in zip(files, results)}
+
+
+def score_real(feature_df: pd.DataFrame, L: int = 18, seed: int = 42) -> pd.DataFrame:
+    """Encode the feature rows with the baseline model and add the centered conduct score."""
+    # scaler, encoder and conduct axis of the baseline run, evaluated in NumPy
+    scorer = NumpyScorer.load(model_artifacts(L, seed)[0])
 
     # ---- prepare real X ----
     df_real = feature_df.dropna(subset=FEATURES_5).copy()
     X = df_real[FEATURES_5].to_numpy().astype(np.float32)
-    Xs = scaler.transform(X).astype(np.float32)
 
     # ---- encode ----
-    Z = encoder.predict(Xs, batch_size=2048, verbose=0)
+    Z = scorer.encode(X)
     df_real["z1"] = Z[:, 0]
     df_real["z2"] = Z[:, 1]
 
     # ---- score ----
-    Z2 = df_real[["z1", "z2"]].to_numpy()
-    df_real["conduct_score_centered"] = score_centered(Z2, mu_C, v_hat)
+    df_real["conduct_score_centered"] = scorer.score(Z)
+    return df_real
 
-    # ---- save scored real file ----
-    out_path = PROJECT_ROOT / "data" / "processed_real" / "real_scored_L18.parquet"
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    df_real.to_parquet(out_path, index=False)
 
-    print("Saved scored real data:", out_path, df_real.shape)
-    print(df_real["conduct_score_centered"].describe())
+def model_artifacts(L: int = 18, seed: int = 42) -> list:
+    baseline_dir = PROJECT_ROOT / "runs" / "dgp0" / f"seed_{seed}" / "baseline"
+    return [baseline_dir / "scoring" / f"scorer_L{L}.npz"]
 
 
-    
+def main(workers: int = 1, full: bool = False):
+    L = 18
+    seed = 42
+    out_dir = PROJECT_ROOT / "data" / "processed_real"
+    out_path = out_dir / f"real_scored_L{L}.parquet"   # directory dataset, one part per refresh
+    manifest_path = refresh_manifest_path(out_dir, L)
+
+    files = hash_files(DATA_DIR / f for f in sorted(file_names()))
+    model = hash_files(model_artifacts(L, seed))
+    code = hash_files(PROJECT_ROOT / f for f in REAL_CODE)
+    previous = None if full else incremental_base(read_refresh_manifest(manifest_path), L, model, files, code)
+    todo = stale_files(previous, files)
+    if not todo:
+        print("Real data up to date:", out_path)
+        return
+
+    #loading, cleaning, windowing and feature eng per new or changed raw file
+    after = {f: previous["files"][f]["last_row"] for f in todo if previous and f in previous["files"]}
+    feature_df, last_rows = ingest(todo, window=L, workers=workers, after=after)
+
+    storing_data_merged(feature_df, f"real_processed_{L}.csv", append=previous is not None)
+
+    df_real = score_real(feature_df, L, seed)
+
+    # ---- save scored real rows ----
+    _, raw_cfg = load_tier0_config(PROJECT_ROOT / "configs" / "dgp0.yaml")
+    apply_dtype_policy(df_real, dtype_policy_from_config(raw_cfg))
+    part = write_dataset_part(df_real, out_path, reset=previous is None)
+
+    done = {} if previous is None else dict(previous["files"])
+    for f in todo:
+        done[f] = {"sha256": files[f], "last_row": last_rows[f]}
+    write_refresh_manifest(manifest_path, {"window": L, "model": model, "code": code, "files": done})
+
+    mode = "full" if previous is None else f"incremental ({len(todo)} of {len(files)} files)"
+    print(f"Saved scored real data ({mode}):", part, df_real.shape)
+    print(df_real["conduct_score_centered"].describe())
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Ingest, featurize and score the raw real-data files.")
+    parser.add_argument("--workers", type=int, default=1, help="processes running the per-file ingestion chains")
+    parser.add_argument("--full", action="store_true", help="reprocess every file instead of only new data")
+    args = parser.parse_args()
+    main(workers=args.workers, full=args.full)
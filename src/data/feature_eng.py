@@ -1,6 +1,11 @@
 import pandas as pd
 import numpy as np
 
+from src.data.feature_registry import FeatureRegistry, FeatureSet, resolve_feature_set
+from src.utils.jit import jit_kernel
+
+_EPS = np.finfo(np.float64).eps
+
 
 def row_autocorr(row: pd.Series, lag: int = 1) -> float:
         """Lagged autocorrelation for a single row of price changes."""
@@ -8,101 +13,267 @@ def row_autocorr(row: pd.Series, lag: int = 1) -> float:
                 return np.nan
         return row.autocorr(lag=lag)
 
-def feature_eng(data: pd.DataFrame, windows = 18) -> pd.DataFrame:
-    """creates features for df"""
-    out = data.copy()
-
-    # detect price columns dynamically and sort by index
-    price_cols = sorted(
-        [c for c in out.columns if c.startswith("Price ")],
-        key=lambda s: int(s.split(" ")[1])
-    )
 
-    out[price_cols] = out[price_cols].apply(pd.to_numeric, errors="coerce")
-    out[price_cols] = np.log(out[price_cols])
+def _nanstd_rows(x: np.ndarray, valid: np.ndarray, ddof: int) -> np.ndarray:
+    """Row std over the valid entries (pandas two-pass nanstd, NaN when count <= ddof)."""
+    count = valid.sum(axis=1)
+    mean = np.where(valid, x, 0.0).sum(axis=1) / count
+    sq = np.where(valid, (x - mean[:, None]) ** 2, 0.0).sum(axis=1)
+    return np.where(count > ddof, np.sqrt(sq / (count - ddof)), np.nan)
 
-    # log returns across months within each window
-    rets = out[price_cols].diff(axis=1).iloc[:, 1:]  # drop first NaN
 
-    out["mean_change"] = rets.mean(axis=1)
-    out["volatility"] = rets.std(axis=1, ddof=0) 
+def _autocorr_rows_loop(r, valid, lag):
+    # loop kernel for Numba: the two-pass formulas of _autocorr_rows, row by row
+    n_rows, n_cols = r.shape
+    out = np.full(n_rows, np.nan)
+    for i in range(n_rows):
+        count = 0
+        for j in range(n_cols):
+            if valid[i, j]:
+                count += 1
+        if count <= lag or n_cols <= lag:
+            continue
 
-    eps = 1e-6
+        m = 0
+        sx = 0.0
+        sy = 0.0
+        for t in range(lag, n_cols):
+            if valid[i, t] and valid[i, t - lag]:
+                m += 1
+                sx += r[i, t]
+                sy += r[i, t - lag]
+        if m < 2:
+            continue
+        x_mean = sx / m
+        y_mean = sy / m
 
-    out["CoV_change"] = out["volatility"] / (out["mean_change"].abs() + eps)
+        c_xy = 0.0
+        c_xx = 0.0
+        c_yy = 0.0
+        for t in range(lag, n_cols):
+            if valid[i, t] and valid[i, t - lag]:
+                dx = r[i, t] - x_mean
+                dy = r[i, t - lag] - y_mean
+                c_xy += dx * dy
+                c_xx += dx * dx
+                c_yy += dy * dy
+        if c_xx == 0.0 or c_yy == 0.0:
+            continue
+        ddof = m - 1
+        corr = (c_xy / ddof) / np.sqrt(c_xx / ddof) / np.sqrt(c_yy / ddof)
+        out[i] = min(max(corr, -1.0), 1.0)
+    return out
 
-    # “near zero” change fraction (rigidity proxy) — tune threshold later
-    out["zero_change_fraction"] = (rets.abs() < 1e-3).sum(axis=1) / rets.shape[1]
 
-    # autocorr of returns within the window
-    out["AR_1"] = rets.apply(row_autocorr, axis=1)
-    out["AR_2"] = rets.apply(lambda row: row_autocorr(row, lag=2), axis=1)
+@jit_kernel(_autocorr_rows_loop)
+def _autocorr_rows(r: np.ndarray, valid: np.ndarray, lag: int) -> np.ndarray:
+    """Row-wise Series.autocorr(lag): Pearson correlation of r[t] and r[t-lag] over valid pairs."""
+    count = valid.sum(axis=1)
+    if r.shape[1] <= lag:
+        return np.full(r.shape[0], np.nan)
 
-    out["kurtosis_change"] = rets.kurtosis(axis=1)
+    x, y = r[:, lag:], r[:, :-lag]
+    pair = valid[:, lag:] & valid[:, :-lag]
+    n = pair.sum(axis=1)
+    x_mean = np.where(pair, x, 0.0).sum(axis=1) / n
+    y_mean = np.where(pair, y, 0.0).sum(axis=1) / n
+    dx = np.where(pair, x - x_mean[:, None], 0.0)
+    dy = np.where(pair, y - y_mean[:, None], 0.0)
+    ddof = n - 1
+    c_xy = (dx * dy).sum(axis=1) / ddof
+    c_xx = (dx * dx).sum(axis=1) / ddof
+    c_yy = (dy * dy).sum(axis=1) / ddof
+    corr = np.clip(c_xy / np.sqrt(c_xx) / np.sqrt(c_yy), -1.0, 1.0)
+    return np.where(count > lag, corr, np.nan)
 
-    # biggest change in price
-    out["max_abs_ret"] = rets.abs().max(axis=1)
 
-    #different reactions to shocks , postive and negative
-    out["pos_vol"] = rets.where(rets > 0).std(axis=1)
-    out["neg_vol"] = rets.where(rets<0).std(axis=1)
+def _kurtosis_rows_loop(r, valid):
+    # loop kernel for Numba: the moments and corrections of _kurtosis_rows, row by row
+    n_rows, n_cols = r.shape
+    eps = _EPS
+    out = np.full(n_rows, np.nan)
+    for i in range(n_rows):
+        count = 0
+        total = 0.0
+        max_abs = 0.0
+        for j in range(n_cols):
+            if valid[i, j]:
+                count += 1
+                total += r[i, j]
+                max_abs = max(max_abs, abs(r[i, j]))
+        if count < 4:
+            continue
+        mean = total / count
 
-    #level voltality
-    out["level_vol"] = out[price_cols].std(axis=1)
+        m2 = 0.0
+        m4 = 0.0
+        for j in range(n_cols):
+            if valid[i, j]:
+                dev2 = (r[i, j] - mean) ** 2
+                m2 += dev2
+                m4 += dev2 ** 2
+        if abs(m2) < (eps * max_abs) ** 2 * count:
+            m2 = 0.0
+        if abs(m4) < (eps * max_abs) ** 4 * count:
+            m4 = 0.0
 
-    #price range
-    out["price_range"] = out[price_cols].max(axis=1) - out[price_cols].min(axis=1)
- 
+        n = float(count)
+        denominator = (n - 2) * (n - 3) * m2 ** 2
+        if denominator == 0.0:
+            out[i] = 0.0
+        else:
+            adj = 3 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+            out[i] = n * (n + 1) * (n - 1) * m4 / denominator - adj
     return out
 
 
-def feature_eng_syn(df: pd.DataFrame) -> pd.DataFrame:
+@jit_kernel(_kurtosis_rows_loop)
+def _kurtosis_rows(r: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """Row-wise bias-corrected excess kurtosis, as DataFrame.kurtosis(axis=1)."""
+    count = valid.sum(axis=1).astype(float)
+    r0 = np.where(valid, r, 0.0)
+    mean = r0.sum(axis=1) / count
+    dev = np.where(valid, r0 - mean[:, None], 0.0)
+    dev2 = dev ** 2
+    m2 = dev2.sum(axis=1)
+    m4 = (dev2 ** 2).sum(axis=1)
+
+    # floating point error: treat moments below the round-off of the data scale as 0
+    max_abs = np.abs(r0).max(axis=1, initial=0.0)
+    eps = np.finfo(np.float64).eps
+    m2 = np.where(np.abs(m2) < (eps * max_abs) ** 2 * count, 0.0, m2)
+    m4 = np.where(np.abs(m4) < (eps * max_abs) ** 4 * count, 0.0, m4)
+
+    adj = 3 * (count - 1) ** 2 / ((count - 2) * (count - 3))
+    numerator = count * (count + 1) * (count - 1) * m4
+    denominator = (count - 2) * (count - 3) * m2 ** 2
+    kurt = np.where(denominator == 0, 0.0, numerator / denominator - adj)
+    return np.where(count < 4, np.nan, kurt)
+
+
+# window features over the (windows x L) price array; each node names its inputs
+WINDOW_FEATURES = FeatureRegistry("window features")
+_node = WINDOW_FEATURES.register
+
+_node("rets", "prices")(lambda p: np.diff(p, axis=1))
+_node("valid", "rets")(lambda rets: ~np.isnan(rets))
+_node("count", "valid")(lambda valid: valid.sum(axis=1))
+_node("abs_rets", "rets")(np.abs)
+_node("p_valid", "prices")(lambda p: ~np.isnan(p))
+
+
+@_node("mean_change", "rets", "valid", "count")
+def _mean_change(rets, valid, count):
+    return np.where(valid, rets, 0.0).sum(axis=1) / count
+
+
+@_node("volatility", "rets", "valid")
+def _volatility(rets, valid):
+    return _nanstd_rows(rets, valid, ddof=0)
+
+
+@_node("CoV_change", "volatility", "mean_change")
+def _cov_change(volatility, mean_change):
+    return volatility / (np.abs(mean_change) + 1e-6)
+
+
+@_node("zero_change_fraction", "abs_rets")
+def _zero_change_fraction(abs_rets):
+    # "near zero" change fraction (rigidity proxy)
+    return (abs_rets < 1e-3).sum(axis=1) / abs_rets.shape[1]
+
+
+_node("AR_1", "rets", "valid")(lambda rets, valid: _autocorr_rows(rets, valid, 1))
+_node("AR_2", "rets", "valid")(lambda rets, valid: _autocorr_rows(rets, valid, 2))
+_node("kurtosis_change", "rets", "valid")(lambda rets, valid: _kurtosis_rows(rets, valid))
+
+
+@_node("max_abs_ret", "abs_rets", "valid", "count")
+def _max_abs_ret(abs_rets, valid, count):
+    return np.where(count > 0, np.where(valid, abs_rets, -np.inf).max(axis=1, initial=-np.inf), np.nan)
+
+
+# different reactions to shocks, positive and negative
+_node("pos_vol", "rets")(lambda rets: _nanstd_rows(rets, rets > 0, ddof=1))
+_node("neg_vol", "rets")(lambda rets: _nanstd_rows(rets, rets < 0, ddof=1))
+_node("level_vol", "prices", "p_valid")(lambda p, p_valid: _nanstd_rows(p, p_valid, ddof=1))
+
+
+@_node("price_range", "prices", "p_valid")
+def _price_range(p, p_valid):
+    return np.where(
+        p_valid.any(axis=1),
+        np.where(p_valid, p, -np.inf).max(axis=1, initial=-np.inf)
+        - np.where(p_valid, p, np.inf).min(axis=1, initial=np.inf),
+        np.nan,
+    )
+
+
+def price_features(prices: np.ndarray, features: FeatureSet = None) -> dict:
     """
-    Feature engineering for windows with columns Price 1..Price L.
-    Assumes Price columns are LOG PRICES.
-    Produces fixed-size feature vector regardless of L.
+    Window features from a (windows x L) array of (log) prices, NaN for missing months.
+
+    `features` is a feature set name or list (default: all); only the intermediates
+    those features depend on are computed. Values match the original per-row pandas
+    reductions, including their NaN rules.
     """
-    out = df.copy()
+    p = np.asarray(prices, dtype=np.float64)
+    if p.ndim != 2:
+        raise ValueError(f"prices must be 2D (windows x L), got shape {p.shape}")
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return WINDOW_FEATURES.evaluate(resolve_feature_set(features), {"prices": p})
 
+
+def _price_cols(df: pd.DataFrame) -> list:
     # detect price columns dynamically and sort by index
-    price_cols = sorted(
-        [c for c in out.columns if c.startswith("Price ")],
+    return sorted(
+        [c for c in df.columns if c.startswith("Price ")],
         key=lambda s: int(s.split(" ")[1])
     )
 
-    out[price_cols] = out[price_cols].apply(pd.to_numeric, errors="coerce")
-    #out[price_cols] = np.log(out[price_cols])
-
-    # log returns across months within each window
-    rets = out[price_cols].diff(axis=1).iloc[:, 1:]  # drop first NaN
 
-    out["mean_change"] = rets.mean(axis=1)
-    out["volatility"] = rets.std(axis=1, ddof=0) 
+def _add_features(out: pd.DataFrame, prices: np.ndarray, features) -> pd.DataFrame:
+    # one concat instead of a column insert per feature (a fixed cost per batch)
+    feats = pd.DataFrame(price_features(prices, features), index=out.index)
+    return pd.concat([out.drop(columns=feats.columns, errors="ignore"), feats], axis=1)
 
-    eps = 1e-6
 
-    out["CoV_change"] = out["volatility"] / (out["mean_change"].abs() + eps)
+def feature_eng(data: pd.DataFrame, windows = 18) -> pd.DataFrame:
+    """creates features for df"""
+    out = data.copy()
+    price_cols = _price_cols(out)
 
-    # “near zero” change fraction (rigidity proxy) — tune threshold later
-    out["zero_change_fraction"] = (rets.abs() < 1e-3).sum(axis=1) / rets.shape[1]
+    out[price_cols] = out[price_cols].apply(pd.to_numeric, errors="coerce")
+    out[price_cols] = np.log(out[price_cols])
 
-    # autocorr of returns within the window
-    out["AR_1"] = rets.apply(row_autocorr, axis=1)
-    out["AR_2"] = rets.apply(lambda row: row_autocorr(row, lag=2), axis=1)
+    return _add_features(out, out[price_cols].to_numpy(dtype=np.float64), None)
 
-    out["kurtosis_change"] = rets.kurtosis(axis=1)
 
-    # biggest change in price
-    out["max_abs_ret"] = rets.abs().max(axis=1)
+def feature_eng_syn(
+    df: pd.DataFrame,
+    features: FeatureSet = None,
+    keep_prices: bool = True,
+) -> pd.DataFrame:
+    """
+    Feature engineering for windows with columns Price 1..Price L.
+    Assumes Price columns are LOG PRICES.
+    Produces fixed-size feature vector regardless of L.
 
-    #different reactions to shocks , postive and negative
-    out["pos_vol"] = rets.where(rets > 0).std(axis=1)
-    out["neg_vol"] = rets.where(rets<0).std(axis=1)
+    `features` selects a feature set ("all", "features_5") or list (default: all).
+    With keep_prices=False the Price columns are left out of the result.
+    """
+    price_cols = _price_cols(df)
+    prices = df[price_cols]
+    numeric = all(pd.api.types.is_numeric_dtype(t) for t in prices.dtypes)
+    if not numeric:
+        prices = prices.apply(pd.to_numeric, errors="coerce")
 
-    #level voltality
-    out["level_vol"] = out[price_cols].std(axis=1)
+    if keep_prices:
+        out = df.copy()
+        if not numeric:
+            out[price_cols] = prices
+    else:
+        out = df.drop(columns=price_cols)
 
-    #price range
-    out["price_range"] = out[price_cols].max(axis=1) - out[price_cols].min(axis=1)
- 
-    return out
\ No newline at end of file
+    return _add_features(out, prices.to_numpy(dtype=np.float64), features)
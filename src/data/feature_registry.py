@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple, Union
+
+# Every window feature, in output column order
+FEATURE_COLS = [
+    "mean_change", "volatility", "CoV_change", "zero_change_fraction", "AR_1", "AR_2",
+    "kurtosis_change", "max_abs_ret", "pos_vol", "neg_vol", "level_vol", "price_range",
+]
+
+# Inputs of the autoencoder (training, scoring, real-data scoring)
+FEATURES_5 = ["volatility", "zero_change_fraction", "max_abs_ret", "AR_1", "price_range"]
+
+# A named set, an explicit list of feature names, or None for every feature
+FeatureSet = Union[str, Sequence[str], None]
+
+FEATURE_SETS = {
+    "all": FEATURE_COLS,
+    "features_5": FEATURES_5,
+}
+
+
+def resolve_feature_set(features: FeatureSet = None) -> List[str]:
+    """
+    Feature names for a named set ("all", "features_5") or an explicit list.
+
+    None means every feature. Names are returned in FEATURE_COLS order.
+    """
+    if features is None:
+        features = "all"
+    if isinstance(features, str):
+        if features not in FEATURE_SETS:
+            raise ValueError(f"Unknown feature set '{features}', expected one of {sorted(FEATURE_SETS)}")
+        features = FEATURE_SETS[features]
+    unknown = set(features) - set(FEATURE_COLS)
+    if unknown:
+        raise ValueError(f"Unknown features: {sorted(unknown)}")
+    return [c for c in FEATURE_COLS if c in set(features)]
+
+
+class FeatureRegistry:
+    """
+    Named computations with declared dependencies, evaluated lazily.
+
+    Leaves are the inputs passed to evaluate(); every other node is registered with
+    the names it depends on. evaluate() computes only what the requested names need,
+    each node at most once.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.nodes: Dict[str, Tuple[Tuple[str, ...], Callable]] = {}
+
+    def register(self, name: str, *deps: str) -> Callable:
+        def wrap(fn: Callable) -> Callable:
+            if name in self.nodes:
+                raise ValueError(f"'{name}' is already registered in {self.name}")
+            self.nodes[name] = (deps, fn)
+            return fn
+        return wrap
+
+    def leaves(self, names: Iterable[str]) -> set:
+        """Inputs (unregistered names) that the requested names depend on."""
+        out, seen, stack = set(), set(), list(names)
+        while stack:
+            name = stack.pop()
+            if name in seen:
+                continue
+            seen.add(name)
+            if name in self.nodes:
+                stack.extend(self.nodes[name][0])
+            else:
+                out.add(name)
+        return out
+
+    def evaluate(self, names: Iterable[str], inputs: dict) -> dict:
+        """Values of the requested names, computed from `inputs` through their dependencies."""
+        cache = dict(inputs)
+
+        def value(name: str):
+            if name not in cache:
+                if name not in self.nodes:
+                    raise KeyError(f"'{name}' is neither registered in {self.name} nor an input")
+                deps, fn = self.nodes[name]
+                cache[name] = fn(*(value(d) for d in deps))
+            return cache[name]
+
+        return {name: value(name) for name in names}
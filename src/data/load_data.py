@@ -3,8 +3,13 @@ from typing import Sequence
 
 import pickle
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 from collections.abc import Iterable
 
+from src.data.ragged_windows import RaggedSeries
+from src.utils.parquet_io import map_chunks
+
 
 DATA_DIR = Path(__file__).resolve().parents[2] / "data" / "raw_data"
 INTERIM_DATA_DIR = Path(__file__).resolve().parents[2] / "data" / "interim"
@@ -18,12 +23,14 @@ def file_names() -> list[str]:
 
     return [f.name for f in DATA_DIR.iterdir() if f.is_file()]
 
-def file_names_cleaned() -> list[str]:
-    """Return every file name inside the collusion data directory."""
+def file_names_cleaned(suffix: str | None = None) -> list[str]:
+    """Return every file name inside the interim data directory (optionally only `suffix` files)."""
     if not INTERIM_DATA_DIR.exists():
         raise FileNotFoundError(f"Data directory not found: {INTERIM_DATA_DIR}")
 
-    return [f.name for f in INTERIM_DATA_DIR.iterdir() if f.is_file()]
+    return sorted(
+        f.name for f in INTERIM_DATA_DIR.iterdir() if f.is_file() and (suffix is None or f.suffix == suffix)
+    )
 
 
 
@@ -66,36 +73,45 @@ def load_final(file_name:str):
     else:
         raise ValueError(f"Unsupported file extension: {ext}")
 
-def load_pickle(file_name:str):
+def load_pickle(file_name: str, window: int = 18) -> pd.DataFrame:
+    """
+    Every length-`window` window of each product in an interim pickle, as a
+    Window / Name / Price 1..Price L frame.
 
-    #load data
+    Products may have different lengths; a window is kept when it covers
+    `window` consecutive rows with no dropped observation.
+    """
     with (INTERIM_DATA_DIR / file_name).open("rb") as fp:
         data = pickle.load(fp)
 
-    #create intervals
-    first_key = next(iter(data))
-    intervals = []
-    window = 18
-    for start in range(len(data[first_key]) - window):
-        intervals.append(list(range(start, start + window)))
-
-    all_rows = []
-
-    for name in list(data.keys())[1:]:
-        for i, interval in enumerate(intervals):
-            try:
-                row = {
-                "Window": i,
-                "Name": name
-                }
-                # Add dynamic price columns
-                for j, t in enumerate(interval):
-                    row[f"Price {j+1}"] = data[name][t]
-                all_rows.append(row)
-            except (KeyError, IndexError) as exc:
-                print(f"Failed at {name}, window {i}, time {interval}: {exc}")
-
-    # Combine all rows into a single DataFrame
-    df = pd.DataFrame(all_rows)
-
-    return df
\ No newline at end of file
+    # the first column is the date
+    series = RaggedSeries.from_dict(data, names=list(data)[1:])
+    return series.window_frame(window)
+
+
+
+def read_series(file_name: str, products: Iterable[str] | None = None) -> RaggedSeries:
+    """
+    Cleaned series of an interim Arrow file (clean_data.storing_series).
+
+    The file is memory-mapped; only the rows of `products` (default: all) are read.
+    """
+    with pa.memory_map(str(INTERIM_DATA_DIR / file_name), "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    if products is not None:
+        products = pa.array(list(products), type=pa.string())
+        table = table.filter(pc.is_in(table.column("product"), value_set=products))
+    return RaggedSeries.from_table(table)
+
+
+def load_interim(file_name: str, window: int = 18, products: Iterable[str] | None = None) -> pd.DataFrame:
+    """Window / Name / Price 1..Price L frame of an interim Arrow file, like load_pickle."""
+    return read_series(file_name, products).window_frame(window)
+
+
+def load_interim_many(
+    file_names: Sequence[str], window: int = 18, products: Iterable[str] | None = None, workers: int = 4
+) -> list[pd.DataFrame]:
+    """load_interim for several files, read concurrently on `workers` threads (results in input order)."""
+    products = None if products is None else list(products)
+    return list(map_chunks(lambda name: load_interim(name, window, products), file_names, workers))
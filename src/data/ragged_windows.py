@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+@dataclass
+class RaggedSeries:
+    """
+    Per-product series of different lengths in one flat buffer.
+
+    Product i holds values[offsets[i]:offsets[i + 1]]; `index` keeps the original row
+    label of every value, so gaps left by dropped observations stay visible.
+    """
+    names: list
+    values: np.ndarray    # float64, product after product
+    index: np.ndarray     # int64 row label of each value
+    offsets: np.ndarray   # int64, len(names) + 1
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, pd.Series], names: Optional[Iterable[str]] = None) -> "RaggedSeries":
+        """Pack a {product: Series} dict (as stored by clean_data.storing_data); non-numeric values become NaN."""
+        names = list(data) if names is None else list(names)
+        cols = [pd.Series(data[name]) for name in names]
+
+        offsets = np.zeros(len(cols) + 1, dtype=np.int64)
+        np.cumsum([len(c) for c in cols], out=offsets[1:])
+        if not cols:
+            return cls(names, np.empty(0), np.empty(0, dtype=np.int64), offsets)
+
+        values = np.concatenate([pd.to_numeric(c, errors="coerce").to_numpy(dtype=np.float64) for c in cols])
+        index = np.concatenate([np.asarray(c.index, dtype=np.int64) for c in cols])
+        return cls(names, values, index, offsets)
+
+    @classmethod
+    def from_table(cls, table: pa.Table) -> "RaggedSeries":
+        """
+        Unpack a long (product, row, value) table sorted by product then row, as written
+        by clean_data.storing_series.
+
+        The value buffer is a zero-copy view when the table is memory-mapped.
+        """
+        product = table.unify_dictionaries().column("product").combine_chunks()
+        if pa.types.is_dictionary(product.type):
+            codes = product.indices.to_numpy(zero_copy_only=False)
+            labels = np.asarray(product.dictionary.to_pylist(), dtype=object)
+        else:
+            codes, labels = np.unique(product.to_numpy(zero_copy_only=False), return_inverse=True)[::-1]
+
+        n = len(codes)
+        new_product = np.ones(n, dtype=bool)
+        new_product[1:] = codes[1:] != codes[:-1]
+        starts = np.flatnonzero(new_product)
+        offsets = np.append(starts, n).astype(np.int64)
+
+        values = table.column("value").combine_chunks().to_numpy(zero_copy_only=False)
+        index = table.column("row").combine_chunks().to_numpy(zero_copy_only=False)
+        return cls(
+            list(labels[codes[starts]]), values.astype(np.float64, copy=False),
+            index.astype(np.int64, copy=False), offsets,
+        )
+
+    def last_rows(self) -> dict:
+        """Row label of the last observation of each non-empty product."""
+        ends = self.offsets[1:]
+        has_rows = ends > self.offsets[:-1]
+        return {
+            name: int(label)
+            for name, label in zip(np.asarray(self.names, dtype=object)[has_rows], self.index[ends[has_rows] - 1])
+        }
+
+    def windows(self, window: int, after: Optional[Mapping[str, int]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (product, start) of every window of `window` consecutive rows, over all products.
+
+        A window is valid when it stays inside one product and its row labels are
+        consecutive (no dropped observation inside it). Products are in order, and
+        starts ascend within each product. With `after` ({product: row label}), only
+        windows ending after that product's label are returned (incremental refresh).
+        """
+        n = len(self.values)
+        if n < window:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        product = np.repeat(np.arange(len(self.names)), np.diff(self.offsets))
+
+        # break[k]: rows k and k+1 are not adjacent observations of one product
+        breaks = (np.diff(self.index) != 1) | (product[1:] != product[:-1])
+        n_breaks = np.concatenate(([0], np.cumsum(breaks)))
+
+        starts = np.arange(n - window + 1)
+        starts = starts[n_breaks[starts + window - 1] == n_breaks[starts]]
+        if after is not None:
+            floor = np.iinfo(np.int64).min
+            last = np.array([after.get(name, floor) for name in self.names], dtype=np.int64)
+            starts = starts[self.index[starts + window - 1] > last[product[starts]]]
+        return product[starts], starts
+
+    def window_prices(self, starts: np.ndarray, window: int) -> np.ndarray:
+        """(n_windows, window) values, gathered from a strided view over the buffer."""
+        return sliding_window_view(self.values, window)[starts]
+
+    def window_frame(self, window: int, after: Optional[Mapping[str, int]] = None) -> pd.DataFrame:
+        """
+        Wide Window / Name / Price 1..Price L frame for feature_eng_syn.
+
+        Window is the row label where the window starts; `after` as in windows().
+        """
+        product, starts = self.windows(window, after)
+        meta = pd.DataFrame({
+            "Window": self.index[starts],
+            "Name": pd.Categorical.from_codes(product, categories=self.names),
+        })
+        prices = pd.DataFrame(
+            self.window_prices(starts, window), columns=[f"Price {j}" for j in range(1, window + 1)]
+        )
+        return pd.concat([meta, prices], axis=1)
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from src.utils.pipeline import file_sha256
+
+# Incremental refresh of the real data: the manifest records, per raw file, its
+# content hash and the last row label processed for each product. Rows are assumed
+# to be appended only (new periods at the end); anything else needs a full refresh.
+
+
+def refresh_manifest_path(out_dir: Path, window: int) -> Path:
+    return Path(out_dir) / f"refresh_manifest_L{window}.json"
+
+
+def read_refresh_manifest(path: Path) -> Optional[dict]:
+    path = Path(path)
+    if not path.exists():
+        return None
+    with path.open("r") as fh:
+        return json.load(fh)
+
+
+def write_refresh_manifest(path: Path, manifest: dict) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with tmp.open("w") as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+    tmp.replace(path)
+
+
+def hash_files(paths: Iterable[Path]) -> Dict[str, str]:
+    return {Path(p).name: file_sha256(p) for p in paths}
+
+
+def incremental_base(
+    manifest: Optional[dict],
+    window: int,
+    model: Dict[str, str],
+    files: Dict[str, str],
+    code: Optional[Dict[str, str]] = None,
+) -> Optional[dict]:
+    """
+    The previous manifest if the next run can be incremental on top of it, else None.
+
+    A full refresh is needed when there is no manifest, the window length, the model
+    artifacts or the ingestion/feature code changed (every stored row could change),
+    or a raw file was removed (its rows cannot be dropped from an append-only output).
+    """
+    if manifest is None:
+        return None
+    if manifest.get("window") != window or manifest.get("model") != model:
+        return None
+    if manifest.get("code") != (code or None):
+        return None
+    if not set(manifest.get("files", {})) <= set(files):
+        return None
+    return manifest
+
+
+def stale_files(manifest: Optional[dict], files: Dict[str, str]) -> List[str]:
+    """Raw files that are new or whose content changed since the manifest."""
+    done = {} if manifest is None else manifest.get("files", {})
+    return sorted(f for f, sha in files.items() if done.get(f, {}).get("sha256") != sha)
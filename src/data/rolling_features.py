@@ -0,0 +1,471 @@
+from __future__ import annotations
+
+from typing import Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+
+from src.data.feature_registry import FeatureRegistry, FeatureSet, resolve_feature_set
+from src.simulation.windows.labels import summarize_windows_states
+from src.utils.parquet_io import map_chunks
+
+
+class SlidingAggregate:
+    """
+    Sliding-window sum or max over a stream of equally shaped arrays, O(1) amortized per step.
+
+    The stream is cut into blocks of `width` steps. Inside the current block a running
+    prefix aggregate is kept; when a block completes, its suffix aggregates are built
+    once. The window ending at the current step is the suffix of the previous block
+    joined with the prefix of the current one (van Herk / Gil-Werman), so values that
+    leave the window are never subtracted out: sums do not drift, and a window of
+    zeros sums to exactly 0.
+    """
+
+    def __init__(self, width: int, shape: tuple, op: str = "sum"):
+        if op not in ("sum", "max"):
+            raise ValueError(f"Unknown op '{op}', expected 'sum' or 'max'")
+        self.width = width
+        self.op = op
+        self.identity = 0.0 if op == "sum" else -np.inf
+        self.empty = np.full(shape, self.identity)
+        n = max(width, 0)
+        self.block = np.full((n,) + tuple(shape), self.identity)
+        self.suffix = np.full((n + 1,) + tuple(shape), self.identity)   # suffix[j]: aggregate of block[j:]
+        self.prefix = self.empty
+        self.steps = 0
+
+    def _combine(self, a, b):
+        return a + b if self.op == "sum" else np.maximum(a, b)
+
+    def push(self, x: np.ndarray) -> np.ndarray:
+        """Add the next value and return the aggregate of the last `width` values."""
+        if self.width <= 0:
+            return self.empty
+
+        j = self.steps % self.width
+        self.steps += 1
+        self.block[j] = x
+        self.prefix = np.array(x, dtype=float) if j == 0 else self._combine(self.prefix, x)
+
+        if j < self.width - 1:
+            return self._combine(self.suffix[j + 1], self.prefix)
+
+        # block complete: the window is exactly this block
+        rev = self.block[::-1]
+        acc = np.cumsum(rev, axis=0) if self.op == "sum" else np.maximum.accumulate(rev, axis=0)
+        self.suffix[:-1] = acc[::-1]
+        return self.prefix
+
+
+def _centered(ss: np.ndarray, s: np.ndarray, n: np.ndarray) -> np.ndarray:
+    """
+    Sum of squared deviations from power sums, ss - s**2 / n.
+
+    Values within the round-off of ss are set to 0, so windows of (numerically)
+    identical values have no spread instead of a few ulps of noise.
+    """
+    m = ss - s * s / n
+    return np.where(m <= 8 * np.finfo(np.float64).eps * ss, 0.0, m)
+
+
+# Per-observation stat groups. A group covers the window's positions from `skip`
+# onwards (prices from 0, returns from 1, lag-k return pairs from 1 + k) and is
+# aggregated by sum or max.
+STAT_GROUPS = {
+    "rets": (1, "sum"),          # count, sum, sum of squares, near-zero count
+    "rets_high": (1, "sum"),     # third and fourth power sums
+    "rets_max": (1, "max"),      # max |return|
+    "rets_signed": (1, "sum"),   # count, sum, sum of squares of positive, then negative returns
+    "lag1": (2, "sum"),          # pair count, sums, squares and cross product of (r_t, r_t-1)
+    "lag2": (3, "sum"),
+    "prices": (0, "sum"),        # count, sum, sum of squares of shifted prices
+    "prices_max": (0, "max"),    # max price, max of -price
+}
+
+# window features from the aggregated stat groups; each node names its inputs
+AGGREGATE_FEATURES = FeatureRegistry("aggregate features")
+_node = AGGREGATE_FEATURES.register
+
+_node("cnt", "rets")(lambda rets: rets[0])
+_node("mean", "rets")(lambda rets: rets[1] / rets[0])
+_node("m2", "rets")(lambda rets: _centered(rets[2], rets[1], rets[0]))
+_node("mean_change", "mean")(lambda mean: mean)
+
+
+@_node("volatility", "cnt", "m2")
+def _volatility(cnt, m2):
+    return np.where(cnt > 0, np.sqrt(m2 / cnt), np.nan)
+
+
+@_node("CoV_change", "volatility", "mean")
+def _cov_change(volatility, mean):
+    return volatility / (np.abs(mean) + 1e-6)
+
+
+_node("zero_change_fraction", "rets", "n_rets")(lambda rets, n_rets: rets[3] / n_rets)
+
+
+def _autocorr(cnt, pairs, lag):
+    n, sx, sy, sxx, syy, sxy = pairs
+    vx, vy = _centered(sxx, sx, n), _centered(syy, sy, n)
+    corr = np.clip((sxy - sx * sy / n) / np.sqrt(vx) / np.sqrt(vy), -1.0, 1.0)
+    return np.where((cnt > lag) & (n > 1) & (vx > 0) & (vy > 0), corr, np.nan)
+
+
+_node("AR_1", "cnt", "lag1")(lambda cnt, pairs: _autocorr(cnt, pairs, 1))
+_node("AR_2", "cnt", "lag2")(lambda cnt, pairs: _autocorr(cnt, pairs, 2))
+
+
+@_node("kurtosis_change", "rets", "rets_high", "rets_max", "mean", "m2")
+def _kurtosis(rets, rets_high, rets_max, mean, m2):
+    cnt, _, s2 = rets[:3]
+    s3, s4 = rets_high
+    max_abs = rets_max[0]
+    m4 = np.where(m2 == 0, 0.0, np.maximum(s4 - 4 * mean * s3 + 6 * mean ** 2 * s2 - 3 * cnt * mean ** 4, 0.0))
+
+    # same round-off zeroing and bias correction as pandas
+    eps = np.finfo(np.float64).eps
+    m2 = np.where(m2 < (eps * max_abs) ** 2 * cnt, 0.0, m2)
+    m4 = np.where(m4 < (eps * max_abs) ** 4 * cnt, 0.0, m4)
+    adj = 3 * (cnt - 1) ** 2 / ((cnt - 2) * (cnt - 3))
+    numerator = cnt * (cnt + 1) * (cnt - 1) * m4
+    denominator = (cnt - 2) * (cnt - 3) * m2 ** 2
+    kurt = np.where(denominator == 0, 0.0, numerator / denominator - adj)
+    return np.where(cnt < 4, np.nan, kurt)
+
+
+_node("max_abs_ret", "cnt", "rets_max")(lambda cnt, rets_max: np.where(cnt > 0, rets_max[0], np.nan))
+
+
+def _sample_std(n, s, ss):
+    return np.where(n > 1, np.sqrt(_centered(ss, s, n) / (n - 1)), np.nan)
+
+
+_node("pos_vol", "rets_signed")(lambda signed: _sample_std(*signed[:3]))
+_node("neg_vol", "rets_signed")(lambda signed: _sample_std(*signed[3:]))
+_node("level_vol", "prices")(lambda prices: _sample_std(*prices))
+
+
+@_node("price_range", "prices", "prices_max")
+def _price_range(prices, prices_max):
+    return np.where(prices[0] > 0, prices_max[0] + prices_max[1], np.nan)
+
+
+def _stat_groups(names) -> list:
+    """Stat groups the requested features depend on."""
+    return [g for g in STAT_GROUPS if g in AGGREGATE_FEATURES.leaves(names)]
+
+
+def _pair_stats(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    ok = ~(np.isnan(x) | np.isnan(y))
+    x = np.where(ok, x, 0.0)
+    y = np.where(ok, y, 0.0)
+    return np.stack([ok.astype(float), x, y, x * x, y * y, x * y])
+
+
+def _point_stats(groups, p: np.ndarray, r: np.ndarray, r1: np.ndarray, r2: np.ndarray, ref: np.ndarray) -> dict:
+    """
+    Per-observation terms of the requested stat groups.
+
+    p is the price, r the return into it and r1/r2 the returns one and two steps
+    back, all of the same shape; ref is the price shift of each market. Every group
+    stacks its terms on a new leading axis.
+    """
+    ok = ~np.isnan(r)
+    r0 = np.where(ok, r, 0.0)
+    p_ok = ~np.isnan(p)
+    out = {}
+    for group in groups:
+        if group == "rets":
+            out[group] = np.stack([ok, r0, r0 ** 2, ok & (np.abs(r0) < 1e-3)]).astype(float)
+        elif group == "rets_high":
+            out[group] = np.stack([r0 ** 3, r0 ** 4])
+        elif group == "rets_max":
+            out[group] = np.where(ok, np.abs(r0), -np.inf)[None]
+        elif group == "rets_signed":
+            pos, neg = np.where(r > 0, r, 0.0), np.where(r < 0, r, 0.0)
+            out[group] = np.stack([r > 0, pos, pos ** 2, r < 0, neg, neg ** 2]).astype(float)
+        elif group == "lag1":
+            out[group] = _pair_stats(r, r1)
+        elif group == "lag2":
+            out[group] = _pair_stats(r, r2)
+        elif group == "prices":
+            p0 = np.where(p_ok, p - ref, 0.0)
+            out[group] = np.stack([p_ok, p0, p0 ** 2]).astype(float)
+        elif group == "prices_max":
+            out[group] = np.where(p_ok, np.stack([p, -p]), -np.inf)
+    return out
+
+
+def _long_series(df: pd.DataFrame, price_col: str, state_col: str | None, id_col: str, time_col: str) -> dict:
+    """Sort the long series by market and time and locate each market's rows."""
+    required = {id_col, time_col, price_col} | ({state_col} if state_col is not None else set())
+    missing = required - set(df.columns)
+    if missing:
+        raise ValueError(f"Missing columns: {missing}")
+
+    df = df.sort_values([id_col, time_col])
+    ids = df[id_col].to_numpy()
+    p = pd.to_numeric(df[price_col], errors="coerce").to_numpy(dtype=np.float64)
+
+    n = len(df)
+    new_market = np.ones(n, dtype=bool)
+    new_market[1:] = ids[1:] != ids[:-1]
+    market_start = np.flatnonzero(new_market)
+    lengths = np.diff(np.append(market_start, n))
+    market = np.repeat(np.arange(len(market_start)), lengths)
+
+    return dict(
+        ids=ids,
+        times=df[time_col].to_numpy(),
+        p=p,
+        S=df[state_col].to_numpy() if state_col is not None else None,
+        market_start=market_start,
+        lengths=lengths,
+        market=market,
+        # prices are shifted by each market's first valid price to keep the level sums well conditioned
+        ref=np.nan_to_num(pd.Series(p).groupby(market).first().to_numpy()),
+    )
+
+
+def _window_table(series: dict, start_rows: np.ndarray, window: int, feats: dict, id_col: str) -> pd.DataFrame:
+    out = {
+        id_col: series["ids"][start_rows],
+        "window_start": series["times"][start_rows].astype(int),
+        "window_end": series["times"][start_rows + window - 1].astype(int),
+        "window_length": np.full(len(start_rows), int(window)),
+    }
+    if series["S"] is not None:
+        out.update(summarize_windows_states(series["S"], start_rows, window))
+    out.update(feats)
+    return pd.DataFrame(out)
+
+
+def rolling_features(
+    df: pd.DataFrame,
+    window: int,
+    features: FeatureSet = None,
+    price_col: str = "p",
+    state_col: str | None = "S",
+    id_col: str = "market_id",
+    time_col: str = "t",
+) -> pd.DataFrame:
+    """
+    Window features straight from a long (market, t, price) series, without building
+    the Price 1..Price L table.
+
+    All markets are streamed in lockstep, one time step at a time: each step pushes
+    the new price and return into sliding sums (counts, power sums, lagged cross
+    products, signed sums) and sliding extrema, and emits one feature row for every
+    market whose window is complete. Cost is O(T) per market for any window length.
+    `features` (set name or list, default all) limits the stats that are tracked.
+
+    Rows and columns match make_windows(...) + feature_eng_syn without the price
+    columns, and values agree to floating point round-off on windows whose returns
+    vary. Windows of constant returns (constant or exactly linear prices) differ:
+    their spread is zeroed (see _centered), so volatility and kurtosis are 0 and the
+    autocorrelations NaN, where pandas returns round-off noise (e.g. AR_1 of -0.88).
+    With state_col=None (real data) the regime labels are omitted.
+    """
+    if window < 2:
+        raise ValueError(f"window must be at least 2, got {window}")
+    names = resolve_feature_set(features)
+    groups = _stat_groups(names)
+    series = _long_series(df, price_col, state_col, id_col, time_col)
+    p, market_start, lengths, ref = series["p"], series["market_start"], series["lengths"], series["ref"]
+
+    n_windows = np.maximum(lengths - window + 1, 0)
+    out_offset = np.concatenate([[0], np.cumsum(n_windows)[:-1]])
+    total = int(n_windows.sum())
+
+    n_markets = len(market_start)
+    sums = dict.fromkeys(groups)   # sliding aggregates, created once the number of terms is known
+
+    feats = {c: np.full(total, np.nan) for c in names}
+    start_rows = np.zeros(total, dtype=np.int64)
+
+    prev_p = np.full(n_markets, np.nan)
+    r1 = np.full(n_markets, np.nan)   # returns one and two steps back
+    r2 = np.full(n_markets, np.nan)
+
+    for step in range(int(lengths.max()) if n_markets else 0):
+        active = step < lengths
+        rows = market_start + np.minimum(step, lengths - 1)
+        p_t = np.where(active, p[rows], np.nan)
+        r = p_t - prev_p
+
+        agg = {}
+        for group, values in _point_stats(groups, p_t, r, r1, r2, ref).items():
+            if sums[group] is None:
+                skip, op = STAT_GROUPS[group]
+                sums[group] = SlidingAggregate(window - skip, values.shape, op=op)
+            agg[group] = sums[group].push(values)
+        r2, r1, prev_p = r1, r, p_t
+
+        emit = np.flatnonzero(active & (step >= window - 1))
+        if len(emit) == 0:
+            continue
+        out_rows = out_offset[emit] + step - window + 1
+        inputs = {k: v[..., emit] for k, v in agg.items()}
+        inputs["n_rets"] = window - 1
+        with np.errstate(invalid="ignore", divide="ignore"):
+            step_feats = AGGREGATE_FEATURES.evaluate(names, inputs)
+        for c in names:
+            feats[c][out_rows] = step_feats[c]
+        start_rows[out_rows] = market_start[emit] + step - window + 1
+
+    return _window_table(series, start_rows, window, feats, id_col)
+
+
+def _prefix_sums(values: np.ndarray) -> tuple:
+    """
+    Compensated prefix sums along the last axis: (high, low)[..., k] sum positions < k.
+
+    `high` is the plain running sum and `low` accumulates its rounding errors
+    (TwoSum), so a window sum high[b] - high[a] + low[b] - low[a] is accurate to the
+    window's own magnitude rather than to the whole series total. Windows of zeros
+    sum to exactly 0.
+    """
+    pad = np.zeros(values.shape[:-1] + (1,))
+    high = np.concatenate([pad, np.cumsum(values, axis=-1)], axis=-1)
+    a, b, s = high[..., :-1], values, high[..., 1:]
+    bb = s - a
+    err = (a - (s - bb)) + (b - bb)
+    low = np.concatenate([pad, np.cumsum(err, axis=-1)], axis=-1)
+    return high, low
+
+
+class _SparseMax:
+    """Range maxima along the last axis of a (terms, markets, t) array, O(1) per query."""
+
+    def __init__(self, values: np.ndarray):
+        self.levels = [values]   # levels[j][..., k]: max over [k, k + 2**j), built on demand
+
+    def query(self, m: np.ndarray, start: np.ndarray, width: int) -> np.ndarray:
+        """Max over positions [start, start + width) of markets m, per term."""
+        j = int(np.log2(width))
+        while len(self.levels) <= j:
+            prev, half = self.levels[-1], 1 << (len(self.levels) - 1)
+            self.levels.append(np.maximum(prev[..., :-half], prev[..., half:]))
+        level = self.levels[j]
+        return np.maximum(level[:, m, start], level[:, m, start + width - (1 << j)])
+
+
+def _multiscale_chunk(series: dict, first: int, last: int, windows: list, names: list, groups: list, id_col: str) -> list:
+    """Feature tables (one per window length) of markets first..last-1."""
+    market_start, lengths = series["market_start"][first:last], series["lengths"][first:last]
+    n_markets = last - first
+    t_max = int(lengths.max())
+    row0, row1 = market_start[0], market_start[-1] + lengths[-1]
+
+    # (markets x t_max) layout, NaN past the end of shorter markets
+    market = series["market"][row0:row1] - first
+    pos = np.arange(row0, row1) - market_start[market]
+    P = np.full((n_markets, t_max), np.nan)
+    P[market, pos] = series["p"][row0:row1]
+    R = np.full_like(P, np.nan)
+    R[:, 1:] = np.diff(P, axis=1)
+    R1 = np.full_like(P, np.nan)   # returns one and two steps back
+    R1[:, 1:] = R[:, :-1]
+    R2 = np.full_like(P, np.nan)
+    R2[:, 2:] = R[:, :-2]
+
+    with np.errstate(invalid="ignore"):
+        stats = _point_stats(groups, P, R, R1, R2, series["ref"][first:last, None])
+    tables = {
+        g: _prefix_sums(v) if STAT_GROUPS[g][1] == "sum" else _SparseMax(v)
+        for g, v in stats.items()
+    }
+
+    def window_stat(group, m, s, L):
+        skip, op = STAT_GROUPS[group]
+        lo, hi = np.minimum(s + skip, s + L), s + L
+        if op == "max":
+            return tables[group].query(m, lo, L - skip)
+        high, low = tables[group]
+        return (high[:, m, hi] - high[:, m, lo]) + (low[:, m, hi] - low[:, m, lo])
+
+    out = []
+    for L in windows:
+        n_windows = np.maximum(lengths - L + 1, 0)
+        m = np.repeat(np.arange(n_markets), n_windows)
+        s = np.arange(len(m)) - np.repeat(np.cumsum(n_windows) - n_windows, n_windows)
+
+        # window positions s..s+L-1: prices at all of them, returns from s+1
+        inputs = {g: window_stat(g, m, s, L) for g in groups}
+        inputs["n_rets"] = L - 1
+        with np.errstate(invalid="ignore", divide="ignore"):
+            feats = AGGREGATE_FEATURES.evaluate(names, inputs)
+        out.append(_window_table(series, market_start[m] + s, L, feats, id_col))
+    return out
+
+
+def _iter_multiscale(
+    df: pd.DataFrame, windows, features, price_col, state_col, id_col, time_col, chunk_markets: int, workers: int
+) -> Iterator[list]:
+    windows = list(windows)
+    if any(w < 2 for w in windows):
+        raise ValueError(f"window lengths must be at least 2, got {windows}")
+    if chunk_markets < 1:
+        raise ValueError(f"chunk_markets must be >= 1, got {chunk_markets}")
+    names = resolve_feature_set(features)
+    groups = _stat_groups(names)
+    series = _long_series(df, price_col, state_col, id_col, time_col)
+    n_markets = len(series["market_start"])
+
+    def featurize(first: int) -> list:
+        last = min(first + chunk_markets, n_markets)
+        return _multiscale_chunk(series, first, last, windows, names, groups, id_col)
+
+    yield from map_chunks(featurize, range(0, n_markets, chunk_markets), workers)
+
+
+def iter_multiscale_features(
+    df: pd.DataFrame,
+    windows: Iterable[int] = (18, 24, 36),
+    features: FeatureSet = None,
+    price_col: str = "p",
+    state_col: str | None = "S",
+    id_col: str = "market_id",
+    time_col: str = "t",
+    chunk_markets: int = 256,
+    workers: int = 1,
+) -> Iterator[pd.DataFrame]:
+    """
+    multiscale_features one chunk of `chunk_markets` markets at a time.
+
+    Each chunk holds every window length of its markets, stacked by length. The
+    dense per-chunk tables bound memory by the chunk size, whatever the number of
+    markets; chunks are featurized on `workers` threads.
+    """
+    for tables in _iter_multiscale(df, windows, features, price_col, state_col, id_col, time_col, chunk_markets, workers):
+        yield pd.concat(tables, ignore_index=True)
+
+
+def multiscale_features(
+    df: pd.DataFrame,
+    windows: Iterable[int] = (18, 24, 36),
+    features: FeatureSet = None,
+    price_col: str = "p",
+    state_col: str | None = "S",
+    id_col: str = "market_id",
+    time_col: str = "t",
+    chunk_markets: int = 256,
+    workers: int = 1,
+) -> pd.DataFrame:
+    """
+    Window features for several window lengths from one set of per-market prefix sums.
+
+    Prefix sums of the per-observation terms (counts, power sums, lagged products,
+    zero-change and signed terms) and a sparse table of range maxima are built once;
+    every window of every length is then O(1), so adding a length costs only its own
+    rows. `features` (set name or list, default all) limits the terms that are built.
+    Markets are processed in chunks of `chunk_markets` (see iter_multiscale_features).
+    Returns one table keyed by (market, window_start, window_length), stacked by
+    length; each block equals rolling_features(df, L).
+    """
+    chunks = list(_iter_multiscale(df, windows, features, price_col, state_col, id_col, time_col, chunk_markets, workers))
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat([table for i in range(len(chunks[0])) for table in (c[i] for c in chunks)], ignore_index=True)
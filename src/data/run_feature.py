@@ -1,6 +1,7 @@
 import pandas as pd
 import sys
 from pathlib import Path
+from typing import Optional
 
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 if str(PROJECT_ROOT) not in sys.path:
@@ -8,28 +9,151 @@ if str(PROJECT_ROOT) not in sys.path:
 from src.utils.paths import run_dir
 from src.utils.config import load_tier0_config
 from src.data.feature_eng import feature_eng_syn
+from src.data.feature_registry import FeatureSet
+from src.data.rolling_features import iter_multiscale_features, rolling_features
+from src.simulation.windows.windows import iter_windows, read_windows
+from src.utils.parquet_io import ParquetStreamWriter, map_chunks
+from src.utils.schema import DtypePolicy, apply_dtype_policy, dtype_policy_from_config
+
+FEATURE_ENGINES = ("windows", "rolling", "multiscale")
+MULTISCALE_FILE = "features_multiscale.parquet"
+
+
+def features_path(base: Path, w: int, engine: str = "windows") -> Path:
+    """Feature file holding the length-w windows of a run folder for the given engine."""
+    if engine not in FEATURE_ENGINES:
+        raise ValueError(f"Unknown feature engine '{engine}', expected one of {FEATURE_ENGINES}")
+    name = MULTISCALE_FILE if engine == "multiscale" else f"features_L{w}.parquet"
+    return base / "data" / "features" / name
+
+
+def read_features(base: Path, w: int, engine: str = "windows") -> pd.DataFrame:
+    """Features of the length-w windows; the multiscale table is filtered on window_length."""
+    path = features_path(base, w, engine)
+    if engine == "multiscale":
+        return pd.read_parquet(path, filters=[("window_length", "==", w)])
+    return pd.read_parquet(path)
+
+
+def build_features(
+    base: Path,
+    w: int,
+    policy: DtypePolicy,
+    engine: str = "windows",
+    features: FeatureSet = None,
+    batch_size: Optional[int] = None,
+    workers: int = 1,
+) -> Path:
+    """
+    Featurize one run folder into features_L{w}.parquet.
+
+    engine "windows" featurizes windows_L{w}.parquet; "rolling" streams the features
+    straight from series.parquet and needs no windows file (no Price columns in the output).
+    `features` is a feature set name or list (None: all); with a subset only the
+    statistics those features need are computed, and the Price columns are dropped.
+    With batch_size the windows engine runs out of core (see build_features_chunked).
+    """
+    if engine not in ("windows", "rolling"):
+        raise ValueError(f"build_features supports the 'windows' and 'rolling' engines, got '{engine}'")
+    if engine == "windows" and batch_size:
+        return build_features_chunked(base, w, policy, features, batch_size, workers)
+
+    feat_dir = base / "data" / "features"
+    feat_dir.mkdir(parents=True, exist_ok=True)
+    series_path = base / "data" / "series.parquet"
+
+    if engine == "rolling":
+        dff = rolling_features(pd.read_parquet(series_path), w, features)
+    else:
+        # index-layout windows are rebuilt from the series here
+        dfw = read_windows(base / "data" / "windows" / f"windows_L{w}.parquet", series_path)
+        dff = feature_eng_syn(dfw, features, keep_prices=features in (None, "all"))
+
+    apply_dtype_policy(dff, policy)
+
+    out = features_path(base, w, engine)
+    dff.to_parquet(out, index=False)
+    return out
+
+
+def build_features_chunked(
+    base: Path,
+    w: int,
+    policy: DtypePolicy,
+    features: FeatureSet = None,
+    batch_size: int = 65_536,
+    workers: int = 1,
+) -> Path:
+    """
+    Featurize windows_L{w}.parquet batch by batch into features_L{w}.parquet.
+
+    Record batches of at most `batch_size` windows are featurized (on `workers`
+    threads) and appended to the output as row groups, so peak memory is set by the
+    batch size rather than the size of the windows file. The rows and values match
+    build_features.
+    """
+    keep_prices = features in (None, "all")
+
+    def featurize(dfw: pd.DataFrame) -> pd.DataFrame:
+        return apply_dtype_policy(feature_eng_syn(dfw, features, keep_prices=keep_prices), policy)
+
+    batches = iter_windows(
+        base / "data" / "windows" / f"windows_L{w}.parquet", base / "data" / "series.parquet", batch_size
+    )
+    out = features_path(base, w, "windows")
+    with ParquetStreamWriter(out) as writer:
+        for dff in map_chunks(featurize, batches, workers):
+            writer.write(dff)
+    return out
+
+
+def build_features_multiscale(
+    base: Path,
+    lengths,
+    policy: DtypePolicy,
+    features: FeatureSet = None,
+    chunk_markets: int = 256,
+    workers: int = 1,
+) -> Path:
+    """
+    Featurize every window length of one run folder into a single features_multiscale.parquet.
+
+    Markets are featurized `chunk_markets` at a time (on `workers` threads) and each
+    chunk is appended as a row group, so memory is bounded by the chunk size.
+    """
+    series = pd.read_parquet(base / "data" / "series.parquet")
+    out = base / "data" / "features" / MULTISCALE_FILE
+    with ParquetStreamWriter(out) as writer:
+        for dff in iter_multiscale_features(series, lengths, features, chunk_markets=chunk_markets, workers=workers):
+            writer.write(apply_dtype_policy(dff, policy))
+    return out
+
 
 def main():
     _, raw_cfg = load_tier0_config("configs/dgp0.yaml")
     seed = raw_cfg["simulation"]["seed"]
+    policy = dtype_policy_from_config(raw_cfg)
+    engine = raw_cfg.get("features", {}).get("engine", "windows")
+    features = raw_cfg.get("features", {}).get("set")
+    batch_size = raw_cfg.get("features", {}).get("batch_size")
+    workers = raw_cfg.get("features", {}).get("workers", 1)
     experiment = "dgp0"
 
     for mode in ["baseline", "kappa_only", "beta_only", "calm_fundamentals", "trend_fundamentals"]:
         base = run_dir(experiment, seed, mode)
-        win_dir = base / "data" / "windows"
-        feat_dir = base / "data" / "features"
-        feat_dir.mkdir(parents=True, exist_ok=True)
-
-        for w in (18, 24, 36):
-            w_path = win_dir / f"windows_L{w}.parquet"
-            dfw = pd.read_parquet(w_path)
-
-            dff = feature_eng_syn(dfw)
 
-            out = feat_dir / f"features_L{w}.parquet"
-            dff.to_parquet(out, index=False)
+        if engine == "multiscale":
+            out = build_features_multiscale(
+                base, (18, 24, 36), policy, features,
+                chunk_markets=raw_cfg["features"].get("chunk_markets", 256), workers=workers,
+            )
+        else:
+            for w in (18, 24, 36):
+                out = build_features(
+                    base, w, policy, engine=engine, features=features, batch_size=batch_size, workers=workers
+                )
 
-        print(f"Saved features for {mode} in {feat_dir}")
+        print(f"Saved features for {mode} in {out.parent}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,7 +1,4 @@
 import tensorflow as tf
-import pandas as pd
-import numpy as np
-import plotly.express as px
 from tensorflow.keras import layers
 from tensorflow.keras.models import Model
 
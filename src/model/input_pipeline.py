@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Sequence
+
+import numpy as np
+import pyarrow.parquet as pq
+
+from src.data.feature_registry import FEATURES_5
+from src.data.run_feature import features_path
+from src.utils.paths import run_dir
+
+# Streaming training input: feature files are read one Parquet row group (shard) at
+# a time, in record batches of a few columns, so memory is set by the batch and
+# shuffle buffer sizes, not by the number of pooled windows.
+
+
+@dataclass(frozen=True)
+class Shard:
+    """One row group of a feature file; `lengths` filters a multiscale file on window_length."""
+    path: str
+    row_group: int
+    lengths: Optional[tuple] = None
+
+
+def feature_shards(
+    experiment: str, seed: int, modes: Sequence[str], lengths: Sequence[int], feature_engine: str = "windows"
+) -> List[Shard]:
+    """Row groups of the feature files of every (mode, L) to pool."""
+    shards = []
+    for mode in modes:
+        base = run_dir(experiment, seed, mode)
+        if feature_engine == "multiscale":
+            files = [(features_path(base, None, feature_engine), tuple(int(L) for L in lengths))]
+        else:
+            files = [(features_path(base, L, feature_engine), None) for L in lengths]
+        for path, only in files:
+            n = pq.ParquetFile(path).metadata.num_row_groups
+            shards.extend(Shard(str(path), i, only) for i in range(n))
+    return shards
+
+
+def read_shard(shard: Shard, columns: Sequence[str] = FEATURES_5, batch_rows: int = 65_536) -> Iterator[np.ndarray]:
+    """float32 (rows, features) arrays of one shard; rows with a missing feature are dropped."""
+    columns = list(columns)
+    read = columns + (["window_length"] if shard.lengths else [])
+    for batch in pq.ParquetFile(shard.path).iter_batches(
+        batch_size=batch_rows, row_groups=[shard.row_group], columns=read
+    ):
+        X = np.column_stack([batch.column(c).to_numpy(zero_copy_only=False) for c in columns]).astype(np.float32)
+        keep = ~np.isnan(X).any(axis=1)
+        if shard.lengths:
+            keep &= np.isin(batch.column("window_length").to_numpy(zero_copy_only=False), shard.lengths)
+        yield X[keep]
+
+
+def split_rows(
+    shards: Sequence[Shard], index: int, split: str, seed: int, val_fraction: float, batch_rows: int = 65_536
+) -> Iterator[np.ndarray]:
+    """
+    Rows of shard `index` in the "train" or "val" split, shuffled within each batch.
+
+    Each row's split is drawn from a generator seeded by (seed, shard, batch), so the
+    split is the same in every epoch and for any read order.
+    """
+    for b, X in enumerate(read_shard(shards[index], batch_rows=batch_rows)):
+        rng = np.random.default_rng([seed, index, b])
+        val = rng.random(len(X)) < val_fraction
+        X = X[val] if split == "val" else X[~val]
+        yield X[rng.permutation(len(X))]
+
+
+def fit_scaler(shards: Sequence[Shard], batch_rows: int = 65_536):
+    """StandardScaler fitted in one streaming pass (partial_fit per batch) over every shard."""
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler()
+    for shard in shards:
+        for X in read_shard(shard, batch_rows=batch_rows):
+            if len(X):
+                scaler.partial_fit(X)
+    return scaler
+
+
+def make_dataset(
+    shards: Sequence[Shard],
+    scaler,
+    split: str,
+    seed: int,
+    val_fraction: float = 0.2,
+    batch_size: int = 256,
+    shuffle_buffer: int = 200_000,
+    batch_rows: int = 65_536,
+    parallel_reads: int = 4,
+):
+    """
+    tf.data pipeline of scaled (x, x) batches for one split.
+
+    Shards are decoded on `parallel_reads` interleaved readers (pyarrow releases the
+    GIL while decoding). The train split visits shards in a new order every epoch
+    and shuffles rows through a bounded buffer of `shuffle_buffer` rows.
+    """
+    import tensorflow as tf
+
+    mean = scaler.mean_.astype(np.float32)
+    scale = scaler.scale_.astype(np.float32)
+    spec = tf.TensorSpec(shape=(None, len(mean)), dtype=tf.float32)
+    train = split == "train"
+
+    def rows(index):
+        for X in split_rows(shards, int(index), split, seed, val_fraction, batch_rows):
+            yield (X - mean) / scale
+
+    ds = tf.data.Dataset.range(len(shards))
+    if train:
+        ds = ds.shuffle(len(shards), seed=seed, reshuffle_each_iteration=True)
+    ds = ds.interleave(
+        lambda i: tf.data.Dataset.from_generator(rows, args=(i,), output_signature=spec),
+        cycle_length=parallel_reads,
+        num_parallel_calls=tf.data.AUTOTUNE,
+        deterministic=not train,
+    ).unbatch()
+    if train:
+        ds = ds.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+    return ds.batch(batch_size).map(lambda x: (x, x)).prefetch(tf.data.AUTOTUNE)
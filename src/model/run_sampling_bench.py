@@ -0,0 +1,77 @@
+"""
+Training time and A6 separation against the window stride.
+
+For every stride, trains the autoencoder on the strided, market-split windows of one
+mode, scores all of that mode's windows with the exported NumPy bundle and reports
+wall-clock training time next to A6 = P(score_K > score_C). Writes
+sampling_bench_L{L}.csv under the mode's eval/ folder.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from src.utils.paths import run_dir
+from src.utils.config import load_tier0_config
+from src.data.run_feature import read_features
+from src.data.feature_registry import FEATURES_5
+from src.scoring.run_scoring import score_features
+from src.simulation.run_evaluation import a6_metric
+
+STRIDES = (1, 2, 4, 8, 18)
+
+
+def main(strides=STRIDES, mode: str = "calm_fundamentals", L: int = 18):
+    from src.model.train_ae import train
+
+    experiment = "dgp0"
+    _, raw_cfg = load_tier0_config("configs/dgp0.yaml")
+    seed = raw_cfg["simulation"]["seed"]
+    feature_engine = raw_cfg.get("features", {}).get("engine", "windows")
+    training_cfg = raw_cfg.get("training", {})
+    sampling = training_cfg.get("sampling") or {}
+
+    base = run_dir(experiment, seed, mode)
+    df = read_features(base, L, feature_engine).dropna(subset=FEATURES_5).reset_index(drop=True)
+
+    rows = []
+    for stride in strides:
+        # market split for every stride, so the runs differ only in how many windows they see
+        cfg = dict(training_cfg, input="memory", sampling=dict(sampling, split="market", stride=stride))
+        model_dir = base / "sampling_bench" / f"stride_{stride}"
+
+        start = time.perf_counter()
+        train(experiment, seed, mode, L, feature_engine, cfg, model_dir=model_dir)
+        seconds = time.perf_counter() - start
+
+        # row counts as recorded by train(), not recomputed here
+        history = pd.read_csv(model_dir / f"history_L{L}.csv")
+        scored, *_ = score_features(df.copy(), model_dir / f"encoder_L{L}.npz")
+        a6 = a6_metric(scored, seed)
+        rows.append({
+            "stride": stride, "train_rows": int(history["train_rows"].iloc[0]),
+            "val_rows": int(history["val_rows"].iloc[0]), "seconds": seconds, "epochs": len(history),
+            "A6_P_K_gt_C": a6,
+        })
+        print(f"stride {stride:>3}: {rows[-1]['train_rows']:>8} train windows, {seconds:7.1f}s, {len(history)} epochs, A6 {a6:.4f}")
+
+    out_dir = base / "eval"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    out = out_dir / f"sampling_bench_L{L}.csv"
+    pd.DataFrame(rows).to_csv(out, index=False)
+    print("Saved sampling benchmark in:", out)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Training time and A6 separation against the window stride.")
+    parser.add_argument("--strides", type=int, nargs="+", default=list(STRIDES), help="window start strides to compare")
+    parser.add_argument("--mode", default="calm_fundamentals", help="stress test mode to train and evaluate on")
+    parser.add_argument("--L", type=int, default=18, help="window length")
+    args = parser.parse_args()
+    main(strides=args.strides, mode=args.mode, L=args.L)
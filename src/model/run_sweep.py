@@ -0,0 +1,182 @@
+import argparse
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Tuple
+
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from src.utils.config import load_tier0_config
+from src.utils.paths import run_dir
+
+# thread pools each worker may use; set before TensorFlow / BLAS are loaded
+THREAD_ENV = (
+    "OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "NUMBA_NUM_THREADS",
+    "TF_NUM_INTRAOP_THREADS", "TF_NUM_INTEROP_THREADS",
+)
+
+
+@dataclass(frozen=True)
+class SweepJob:
+    mode: str
+    L: int
+    seed: int                       # training seed; the features come from the simulated run
+    hidden_dims: Tuple[int, ...]
+
+    @property
+    def name(self) -> str:
+        return f"{self.mode}/L{self.L}/h{'-'.join(map(str, self.hidden_dims))}/s{self.seed}"
+
+    def model_dir(self, experiment: str, data_seed: int) -> Path:
+        dims = "-".join(map(str, self.hidden_dims))
+        return run_dir(experiment, data_seed, self.mode) / "sweep" / f"h{dims}_s{self.seed}"
+
+    def history_path(self, experiment: str, data_seed: int) -> Path:
+        return self.model_dir(experiment, data_seed) / f"history_L{self.L}.csv"
+
+    def is_done(self, experiment: str, data_seed: int) -> bool:
+        # the history is written last, after the model and the NumPy bundle
+        model_dir = self.model_dir(experiment, data_seed)
+        return self.history_path(experiment, data_seed).exists() and (model_dir / f"encoder_L{self.L}.npz").exists()
+
+
+def sweep_jobs(sweep_cfg: dict) -> List[SweepJob]:
+    """Every (mode, L, seed, hidden_dims) combination of the sweep section."""
+    return [
+        SweepJob(mode, int(L), int(seed), tuple(int(h) for h in dims))
+        for mode, L, seed, dims in itertools.product(
+            sweep_cfg["modes"], sweep_cfg["lengths"], sweep_cfg["seeds"], sweep_cfg["hidden_dims"]
+        )
+    ]
+
+
+def _limit_threads(threads: int) -> None:
+    """Process-pool initializer: cap intra-op and inter-op threads of this worker."""
+    for var in THREAD_ENV:
+        os.environ[var] = str(threads)
+
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(threads)
+
+
+def _run_job(args) -> float:
+    job, experiment, data_seed, feature_engine, training_cfg = args
+    from src.model.train_ae import train
+
+    start = time.perf_counter()
+    train(
+        experiment, data_seed, job.mode, job.L, feature_engine, training_cfg,
+        hidden_dims=job.hidden_dims, train_seed=job.seed, model_dir=job.model_dir(experiment, data_seed),
+    )
+    return time.perf_counter() - start
+
+
+def summarize(jobs: List[SweepJob], experiment: str, data_seed: int) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Stack the history_L{L}.csv of every finished job.
+
+    Returns the per-epoch histories (one row per job and epoch) and a summary with
+    one row per job: epochs run, best val_loss and its epoch, final losses.
+    """
+    histories, rows = [], []
+    for job in jobs:
+        path = job.history_path(experiment, data_seed)
+        if not path.exists():
+            continue
+        key = {
+            "mode": job.mode, "L": job.L, "seed": job.seed,
+            "hidden_dims": "-".join(map(str, job.hidden_dims)),
+        }
+        h = pd.read_csv(path)
+        histories.append(h.assign(epoch=range(1, len(h) + 1), **key))
+
+        row = dict(key, epochs=len(h), final_loss=h["loss"].iloc[-1])
+        if "val_loss" in h:
+            best = int(h["val_loss"].idxmin())
+            row.update(best_epoch=best + 1, best_val_loss=h["val_loss"].iloc[best], final_val_loss=h["val_loss"].iloc[-1])
+        rows.append(row)
+
+    history = pd.concat(histories, ignore_index=True) if histories else pd.DataFrame()
+    return history, pd.DataFrame(rows)
+
+
+def run_sweep(
+    experiment: str,
+    data_seed: int,
+    jobs: List[SweepJob],
+    feature_engine: str = "windows",
+    training_cfg: dict | None = None,
+    workers: int = 1,
+    threads: int = 1,
+    resume: bool = True,
+) -> Path:
+    """
+    Train every job on a process pool of `workers`, each capped at `threads` threads.
+
+    Jobs whose artifacts already exist are skipped when resuming. Failed jobs are
+    reported and left out of the summary, and a rerun retries them. Writes
+    sweep_summary.csv and sweep_history.csv under runs/<experiment>/seed_<seed>/.
+    """
+    todo = [job for job in jobs if not (resume and job.is_done(experiment, data_seed))]
+    print(f"Sweep: {len(jobs)} jobs, {len(jobs) - len(todo)} already done, {workers} worker(s) x {threads} thread(s)")
+
+    failed = []
+    if todo:
+        tasks = [(job, experiment, data_seed, feature_engine, training_cfg or {}) for job in todo]
+        # spawn: workers start without the parent's state, and the thread caps apply before TensorFlow loads
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_limit_threads, initargs=(threads,)) as pool:
+            futures = {pool.submit(_run_job, task): task[0] for task in tasks}
+            for done, future in enumerate(as_completed(futures), start=1):
+                job = futures[future]
+                try:
+                    print(f"[{done}/{len(todo)}] {job.name} trained in {future.result():.0f}s")
+                except Exception as exc:
+                    failed.append(job)
+                    print(f"[{done}/{len(todo)}] {job.name} failed: {exc!r}")
+
+    history, summary = summarize(jobs, experiment, data_seed)
+    out_dir = Path("runs") / experiment / f"seed_{data_seed}"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    history.to_csv(out_dir / "sweep_history.csv", index=False)
+    summary.to_csv(out_dir / "sweep_summary.csv", index=False)
+
+    print(f"Saved sweep summary ({len(summary)} of {len(jobs)} jobs) in:", out_dir)
+    if failed:
+        print(f"{len(failed)} job(s) failed: {', '.join(job.name for job in failed)}")
+    return out_dir
+
+
+def main(workers: int | None = None, resume: bool = True):
+    experiment = "dgp0"
+    _, raw_cfg = load_tier0_config("configs/dgp0.yaml")
+    seed = raw_cfg["simulation"]["seed"]
+    feature_engine = raw_cfg.get("features", {}).get("engine", "windows")
+    sweep_cfg = raw_cfg["sweep"]
+
+    threads = int(sweep_cfg.get("threads_per_worker", 1))
+    if workers is None:
+        workers = sweep_cfg.get("workers") or max(1, (os.cpu_count() or 1) // threads)
+
+    run_sweep(
+        experiment, seed, sweep_jobs(sweep_cfg), feature_engine, raw_cfg.get("training", {}),
+        workers=workers, threads=threads, resume=resume,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the autoencoder for every (mode, L, seed, hidden_dims) of the sweep.")
+    parser.add_argument("--workers", type=int, default=None, help="training processes (default: sweep.workers or cpus / threads)")
+    parser.add_argument("--no-resume", action="store_true", help="retrain jobs whose artifacts already exist")
+    args = parser.parse_args()
+    main(workers=args.workers, resume=not args.no_resume)
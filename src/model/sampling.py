@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Consecutive windows of one market share L-1 of their L prices, so training on every
+# window mostly repeats itself and a row-level train/val split puts near-duplicates
+# on both sides. The sampler thins windows by start stride, splits by market and
+# optionally caps each regime stratum.
+
+STRATA = ("state_mode", "is_pure_80")
+
+
+def stride_mask(df: pd.DataFrame, stride: int, start_col: str = "window_start") -> np.ndarray:
+    """Windows whose start is a multiple of `stride` (stride L: non-overlapping windows)."""
+    if stride < 1:
+        raise ValueError(f"stride must be >= 1, got {stride}")
+    return (df[start_col].to_numpy() % stride) == 0
+
+
+def market_val_mask(
+    df: pd.DataFrame, val_fraction: float = 0.2, seed: int = 0, id_col: str = "market_id"
+) -> np.ndarray:
+    """Validation rows: every window of a random `val_fraction` of the markets."""
+    markets = np.unique(df[id_col].to_numpy())
+    rng = np.random.default_rng(seed)
+    n_val = int(round(val_fraction * len(markets)))
+    val_markets = rng.choice(markets, size=n_val, replace=False)
+    return np.isin(df[id_col].to_numpy(), val_markets)
+
+
+def cap_strata(
+    df: pd.DataFrame, rows: np.ndarray, cap: int, seed: int = 0, strata: Sequence[str] = STRATA
+) -> np.ndarray:
+    """
+    At most `cap` rows (positions into df) per stratum, drawn without replacement.
+
+    Strata are the combinations of `strata` (by default regime mode x purity), so
+    the rare cartel windows are not drowned by the competitive ones.
+    """
+    rng = np.random.default_rng(seed)
+    key = df[list(strata)].iloc[rows]
+    _, codes = np.unique(key.to_numpy(), axis=0, return_inverse=True)
+    codes = codes.ravel()
+
+    # a random rank within each stratum; keep the first `cap`
+    order = rng.permutation(len(rows))
+    order = order[np.argsort(codes[order], kind="stable")]
+    sorted_codes = codes[order]
+    first = np.searchsorted(sorted_codes, sorted_codes, side="left")
+    rank = np.arange(len(order)) - first
+    return np.sort(rows[order[rank < cap]])
+
+
+def sample_training_rows(
+    df: pd.DataFrame,
+    stride: int = 1,
+    val_fraction: float = 0.2,
+    seed: int = 0,
+    strata_cap: Optional[int] = None,
+    split: str = "market",
+    strata: Sequence[str] = STRATA,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (train, val) row positions: windows thinned by `stride`, split by market (or by
+    row with split="random"), and with at most `strata_cap` training rows per regime
+    stratum.
+
+    With the market split the validation markets are kept whole (also strided), so
+    validation never sees a window overlapping a training window.
+    """
+    keep = stride_mask(df, stride)
+    if split == "market":
+        val = market_val_mask(df, val_fraction, seed)
+    elif split == "random":
+        val = np.random.default_rng(seed).random(len(df)) < val_fraction
+    else:
+        raise ValueError(f"Unknown split '{split}', expected 'market' or 'random'")
+
+    train_rows = np.flatnonzero(keep & ~val)
+    val_rows = np.flatnonzero(keep & val)
+    if strata_cap is not None:
+        train_rows = cap_strata(df, train_rows, strata_cap, seed, strata)
+    return train_rows, val_rows
@@ -19,32 +19,62 @@ from src.utils.paths import run_dir
 from src.utils.config import load_tier0_config
 from src.utils.seeding import set_global_seed
 from src.model.autoencoder import PriceAutoencoder
-
-FEATURES_5 = ["volatility", "zero_change_fraction", "max_abs_ret", "AR_1", "price_range"]
-
-def main():
-    experiment = "dgp0"
-    _, raw_cfg = load_tier0_config("configs/dgp0.yaml")
-    seed = raw_cfg["simulation"]["seed"]
-    set_global_seed(seed)
-
-    mode = "kappa_only"
-    L = 18
+from src.data.run_feature import read_features
+from src.data.feature_registry import FEATURES_5
+from src.scoring.numpy_scorer import export_bundle
+from src.model.input_pipeline import feature_shards, fit_scaler, make_dataset
+from src.model.sampling import sample_training_rows
+
+def train(
+    experiment: str,
+    seed: int,
+    mode: str,
+    L: int,
+    feature_engine: str = "windows",
+    training_cfg: dict | None = None,
+    hidden_dims=(16, 8),
+    train_seed: int | None = None,
+    model_dir: Path | None = None,
+) -> Path:
+    """
+    Train the autoencoder on one run folder's length-L features and save it under model/.
+
+    `seed` selects the simulated run; `train_seed` (default: seed) seeds the
+    initialization and the train/val split. `model_dir` overrides the output folder
+    (used by the sweep). training.sampling thins and splits the windows (see
+    sampling.sample_training_rows). With training.input "stream" the features are
+    streamed (see train_streaming) instead of loaded into memory.
+    """
+    training_cfg = training_cfg or {}
+    if training_cfg.get("input", "memory") == "stream":
+        return train_streaming(
+            experiment, seed, [mode], [L], feature_engine, hidden_dims=hidden_dims, train_seed=train_seed,
+            model_dir=model_dir, **_stream_options(training_cfg),
+        )
+
+    train_seed = seed if train_seed is None else train_seed
+    set_global_seed(train_seed)
 
     base = run_dir(experiment, seed, mode)
-    feat_path = base / "data" / "features" / f"features_L{L}.parquet"
-    df = pd.read_parquet(feat_path).dropna(subset=FEATURES_5).copy()
+    df = read_features(base, L, feature_engine).dropna(subset=FEATURES_5).copy()
 
     X = df[FEATURES_5].to_numpy().astype(np.float32)
 
     scaler = StandardScaler()
     Xs = scaler.fit_transform(X).astype(np.float32)
 
-    X_train, X_val = train_test_split(Xs, test_size=0.2, random_state=seed)
-
-    ae = PriceAutoencoder(input_dim=len(FEATURES_5), latent_dim=2, hidden_dims=(16, 8), latent_activation=None)
-    ae.compile(optimizer=tf.keras.optimizers.Adam(1e-3), loss="mse")
-
+    sampling = training_cfg.get("sampling") or {}
+    if sampling.get("split", "random") == "random" and sampling.get("stride", 1) == 1 and not sampling.get("strata_cap"):
+        X_train, X_val = train_test_split(Xs, test_size=0.2, random_state=train_seed)
+    else:
+        train_rows, val_rows = sample_training_rows(
+            df, stride=sampling.get("stride", 1), val_fraction=0.2, seed=train_seed,
+            strata_cap=sampling.get("strata_cap"), split=sampling.get("split", "random"),
+        )
+        X_train, X_val = Xs[train_rows], Xs[val_rows]
+        print(f"Sampled {len(train_rows)} train / {len(val_rows)} val of {len(Xs)} windows")
+
+    ae = _autoencoder(hidden_dims)
     callbacks = [keras.callbacks.EarlyStopping(monitor="val_loss", patience=10, restore_best_weights=True)]
 
     history = ae.fit(
@@ -57,17 +87,101 @@ def main():
         verbose=1
     )
 
-    # Save artifacts
-    model_dir = base / "model"
+    rows = {"train_rows": len(X_train), "val_rows": len(X_val)}
+    return _save_artifacts(model_dir or base / "model", f"L{L}", scaler, ae, history, rows)
+
+
+def train_streaming(
+    experiment: str,
+    seed: int,
+    modes,
+    lengths,
+    feature_engine: str = "windows",
+    batch_size: int = 256,
+    shuffle_buffer: int = 200_000,
+    read_batch_rows: int = 65_536,
+    parallel_reads: int = 4,
+    val_fraction: float = 0.2,
+    epochs: int = 200,
+    hidden_dims=(16, 8),
+    train_seed: int | None = None,
+    model_dir: Path | None = None,
+) -> Path:
+    """
+    Train one autoencoder on the pooled features of several modes and window lengths.
+
+    Features are streamed from their Parquet row groups: one pass fits the scaler
+    (partial_fit), then tf.data decodes shards in parallel, shuffles rows through a
+    bounded buffer and prefetches, so memory stays flat in the number of windows.
+    A single (mode, L) saves under that mode's model/ folder with the usual names;
+    a pool saves under the "pooled" run folder, tagged with its lengths.
+    """
+    train_seed = seed if train_seed is None else train_seed
+    set_global_seed(train_seed)
+    modes, lengths = list(modes), [int(L) for L in lengths]
+
+    shards = feature_shards(experiment, seed, modes, lengths, feature_engine)
+    scaler = fit_scaler(shards, read_batch_rows)
+
+    opts = dict(
+        val_fraction=val_fraction, batch_size=batch_size, batch_rows=read_batch_rows, parallel_reads=parallel_reads,
+    )
+    train_ds = make_dataset(shards, scaler, "train", train_seed, shuffle_buffer=shuffle_buffer, **opts)
+    val_ds = make_dataset(shards, scaler, "val", train_seed, **opts)
+
+    ae = _autoencoder(hidden_dims)
+    callbacks = [keras.callbacks.EarlyStopping(monitor="val_loss", patience=10, restore_best_weights=True)]
+    history = ae.fit(train_ds, validation_data=val_ds, epochs=epochs, callbacks=callbacks, verbose=1)
+
+    folder = modes[0] if len(modes) == 1 else "pooled"
+    tag = "L" + "-".join(str(L) for L in lengths)
+    return _save_artifacts(model_dir or run_dir(experiment, seed, folder) / "model", tag, scaler, ae, history)
+
+
+def _stream_options(training_cfg: dict) -> dict:
+    keys = ("batch_size", "shuffle_buffer", "read_batch_rows", "parallel_reads", "val_fraction")
+    return {k: training_cfg[k] for k in keys if k in training_cfg}
+
+
+def _autoencoder(hidden_dims=(16, 8)) -> PriceAutoencoder:
+    ae = PriceAutoencoder(input_dim=len(FEATURES_5), latent_dim=2, hidden_dims=tuple(hidden_dims), latent_activation=None)
+    ae.compile(optimizer=tf.keras.optimizers.Adam(1e-3), loss="mse")
+    return ae
+
+
+def _save_artifacts(model_dir: Path, tag: str, scaler, ae, history, rows: dict | None = None) -> Path:
+    """Save scaler, models, NumPy bundle and history (with the train/val row counts, when known)."""
     model_dir.mkdir(parents=True, exist_ok=True)
 
-    joblib.dump(scaler, model_dir / f"scaler_L{L}.pkl")
-    ae.save(model_dir / f"ae_L{L}.keras")
-    ae.encoder.save(model_dir / f"encoder_L{L}.keras")
+    joblib.dump(scaler, model_dir / f"scaler_{tag}.pkl")
+    ae.save(model_dir / f"ae_{tag}.keras")
+    ae.encoder.save(model_dir / f"encoder_{tag}.keras")
+    export_bundle(model_dir / f"encoder_{tag}.npz", scaler, ae.encoder, FEATURES_5)
 
-    pd.DataFrame(history.history).to_csv(model_dir / f"history_L{L}.csv", index=False)
+    pd.DataFrame(history.history).assign(**(rows or {})).to_csv(model_dir / f"history_{tag}.csv", index=False)
 
     print("Saved model artifacts in:", model_dir)
+    return model_dir
+
+
+def main():
+    experiment = "dgp0"
+    _, raw_cfg = load_tier0_config("configs/dgp0.yaml")
+    seed = raw_cfg["simulation"]["seed"]
+    feature_engine = raw_cfg.get("features", {}).get("engine", "windows")
+    training_cfg = raw_cfg.get("training", {})
+
+    pool = training_cfg.get("pool")
+    if pool:
+        train_streaming(
+            experiment, seed, pool["modes"], pool["lengths"], feature_engine, **_stream_options(training_cfg)
+        )
+        return
+
+    mode = "kappa_only"
+    L = 18
+
+    train(experiment, seed, mode, L, feature_engine, training_cfg)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,205 @@
+import argparse
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from src.data.run_feature import features_path
+from src.utils.config import load_tier0_config
+from src.utils.paths import run_dir
+from src.utils.pipeline import Stage, run_pipeline
+from src.utils.schema import dtype_policy_from_config
+
+# source files each stage depends on; editing one reruns that stage and its consumers
+SIMULATE_CODE = [
+    "src/simulation/dgp0.py", "src/simulation/markov.py", "src/simulation/recurrence.py",
+    "src/simulation/run_dgp0.py", "src/utils/config.py", "src/utils/parquet_io.py", "src/utils/schema.py",
+]
+WINDOW_CODE = [
+    "src/simulation/windows/windows.py", "src/simulation/windows/labels.py",
+    "src/simulation/windows/run_window.py", "src/utils/schema.py",
+]
+FEATURE_CODE = [
+    "src/data/feature_eng.py", "src/data/feature_registry.py", "src/data/rolling_features.py", "src/data/run_feature.py",
+    "src/simulation/windows/windows.py", "src/simulation/windows/labels.py", "src/utils/schema.py",
+]
+TRAIN_CODE = [
+    "src/model/train_ae.py", "src/model/autoencoder.py", "src/model/input_pipeline.py", "src/model/sampling.py",
+    "src/scoring/numpy_scorer.py",
+    "src/data/feature_registry.py", "src/data/run_feature.py", "src/utils/seeding.py",
+]
+SCORE_CODE = [
+    "src/scoring/run_scoring.py", "src/scoring/conduct_axis.py", "src/scoring/numpy_scorer.py",
+    "src/data/feature_registry.py", "src/data/run_feature.py", "src/utils/schema.py",
+]
+
+# simulation settings that change throughput but not the simulated panel
+SIMULATION_RUNTIME_KEYS = ("workers", "stream")
+# feature settings that change memory use and throughput but not the feature values
+FEATURE_RUNTIME_KEYS = ("batch_size", "chunk_markets", "workers")
+
+
+def build_stages(cfg, raw_cfg: dict) -> list:
+    """
+    Build the preprocess -> windows -> feature -> train -> scoring DAG from the config.
+
+    One simulation node writes every mode, since the batched engines derive all
+    modes from one shared draw (common random numbers). The other nodes are per
+    (mode, L) (windows, features) and per configured (mode, L) model (train,
+    scoring), so changing one window length or model only invalidates that part of
+    the graph. With the rolling feature engine
+    the windows nodes are dropped and features are built from the series directly;
+    the multiscale engine builds all lengths of a mode in one features node.
+    """
+    pipe = raw_cfg["pipeline"]
+    experiment = pipe.get("experiment", "dgp0")
+    seed = raw_cfg["simulation"]["seed"]
+    policy = dtype_policy_from_config(raw_cfg)
+    dtypes_cfg = raw_cfg.get("dtypes", {})
+    windows_cfg = raw_cfg.get("windows", {})
+    features_cfg = raw_cfg.get("features", {})
+    feature_engine = features_cfg.get("engine", "windows")
+    feature_set = features_cfg.get("set")
+    feature_key_cfg = {k: v for k, v in features_cfg.items() if k not in FEATURE_RUNTIME_KEYS}
+    training_cfg = raw_cfg.get("training", {})
+
+    sim_cfg = {
+        section: raw_cfg[section]
+        for section in ("cost_process", "price_noise", "regime_parameters", "markov")
+    }
+    sim_cfg["simulation"] = {
+        k: v for k, v in raw_cfg["simulation"].items() if k not in SIMULATION_RUNTIME_KEYS
+    }
+    sim_cfg["dtypes"] = dtypes_cfg
+
+    def simulate():
+        from src.simulation.run_dgp0 import simulate_modes
+        simulate_modes(cfg, raw_cfg, pipe["modes"], experiment=experiment)
+
+    sim_outputs = []
+    for mode in pipe["modes"]:
+        data_dir = run_dir(experiment, seed, mode) / "data"
+        sim_outputs += [data_dir / "series.parquet", data_dir / "market_params.parquet"]
+    stages = [Stage(
+        name="simulate",
+        run=simulate,
+        outputs=sim_outputs,
+        config=dict(sim_cfg, modes=list(pipe["modes"])),
+        code=SIMULATE_CODE,
+    )]
+
+    for mode in pipe["modes"]:
+        base = run_dir(experiment, seed, mode)
+        series = base / "data" / "series.parquet"
+
+        if feature_engine == "multiscale":
+            def featurize_all(base=base):
+                from src.data.run_feature import build_features_multiscale
+                build_features_multiscale(
+                    base, pipe["window_lengths"], policy, feature_set,
+                    chunk_markets=features_cfg.get("chunk_markets", 256), workers=features_cfg.get("workers", 1),
+                )
+
+            stages.append(Stage(
+                name=f"features/{mode}",
+                run=featurize_all,
+                inputs=[series],
+                outputs=[features_path(base, None, feature_engine)],
+                config={"dtypes": dtypes_cfg, "features": feature_key_cfg, "window_lengths": pipe["window_lengths"]},
+                code=FEATURE_CODE,
+            ))
+            continue
+
+        for L in pipe["window_lengths"]:
+            windows = base / "data" / "windows" / f"windows_L{L}.parquet"
+            features = features_path(base, L, feature_engine)
+
+            def windowing(base=base, L=L):
+                from src.simulation.windows.run_window import build_windows
+                build_windows(base, L, policy, layout=windows_cfg.get("layout", "wide"))
+
+            def featurize(base=base, L=L):
+                from src.data.run_feature import build_features
+                build_features(
+                    base, L, policy, engine=feature_engine, features=feature_set,
+                    batch_size=features_cfg.get("batch_size"), workers=features_cfg.get("workers", 1),
+                )
+
+            if feature_engine == "rolling":
+                feature_inputs = [series]
+            else:
+                stages.append(Stage(
+                    name=f"windows/{mode}/L{L}",
+                    run=windowing,
+                    inputs=[series],
+                    outputs=[windows],
+                    config={"L": L, "dtypes": dtypes_cfg, "windows": windows_cfg},
+                    code=WINDOW_CODE,
+                ))
+                feature_inputs = [windows, series]   # series: index-layout windows are rebuilt from it
+            stages.append(Stage(
+                name=f"features/{mode}/L{L}",
+                run=featurize,
+                inputs=feature_inputs,
+                outputs=[features],
+                config={"dtypes": dtypes_cfg, "features": feature_key_cfg},
+                code=FEATURE_CODE,
+            ))
+
+    for model in pipe.get("models", []):
+        mode, L = model["mode"], model["L"]
+        base = run_dir(experiment, seed, mode)
+        features = features_path(base, L, feature_engine)
+        model_dir = base / "model"
+        score_dir = base / "scoring"
+        scaler = model_dir / f"scaler_L{L}.pkl"
+        encoder = model_dir / f"encoder_L{L}.keras"
+        bundle = model_dir / f"encoder_L{L}.npz"   # what scoring reads
+
+        def train(mode=mode, L=L):
+            from src.model.train_ae import train
+            train(experiment, seed, mode, L, feature_engine, training_cfg)
+
+        def score(mode=mode, L=L):
+            from src.scoring.run_scoring import score
+            score(experiment, seed, mode, mode, L, policy, feature_engine)
+
+        stages.append(Stage(
+            name=f"train/{mode}/L{L}",
+            run=train,
+            inputs=[features],
+            outputs=[scaler, model_dir / f"ae_L{L}.keras", encoder, bundle, model_dir / f"history_L{L}.csv"],
+            config={"seed": seed, "mode": mode, "L": L, "features": feature_key_cfg, "training": training_cfg},
+            code=TRAIN_CODE,
+        ))
+        stages.append(Stage(
+            name=f"scoring/{mode}/L{L}",
+            run=score,
+            inputs=[features, bundle],
+            outputs=[
+                score_dir / f"scoring_L{L}.parquet",
+                score_dir / f"mu_C_L{L}.npy",
+                score_dir / f"mu_K_L{L}.npy",
+                score_dir / f"v_hat_L{L}.npy",
+                score_dir / f"scorer_L{L}.npz",
+            ],
+            config={"dtypes": dtypes_cfg},
+            code=SCORE_CODE,
+        ))
+
+    return stages
+
+
+def main(force: bool = False, dry_run: bool = False):
+    cfg, raw_cfg = load_tier0_config("configs/dgp0.yaml")
+    ran = run_pipeline(build_stages(cfg, raw_cfg), force=force, dry_run=dry_run)
+    print(f"{len(ran)} stage(s) {'stale' if dry_run else 'run'}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the synthetic pipeline, skipping stages whose inputs are unchanged.")
+    parser.add_argument("--force", action="store_true", help="rerun every stage")
+    parser.add_argument("--dry-run", action="store_true", help="only report which stages would run")
+    args = parser.parse_args()
+    main(force=args.force, dry_run=args.dry_run)
@@ -0,0 +1,93 @@
+"""
+Startup budget for the collusion CLI.
+
+Times `collusion --help` and the imports of the NumPy-only stages, each in a fresh
+interpreter (best of a few runs), and fails when one goes over its budget or pulls
+in a heavy dependency it does not need.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+# seconds, wall clock of the whole process for --help, import time for the stages
+HELP_BUDGET = 0.5
+STAGE_BUDGET = 1.5
+
+HEAVY_MODULES = ("tensorflow", "keras", "sklearn", "plotly", "joblib", "numba")
+
+# stage -> module its subcommand imports
+NUMPY_STAGES = {
+    "simulate": "src.simulation.run_dgp0",
+    "windows": "src.simulation.windows.run_window",
+    "features": "src.data.run_feature",
+    "score": "src.scoring.run_scoring",
+    "real": "src.data.data_orchestrator",
+    "pipeline": "src.run_pipeline",
+    "sweep": "src.model.run_sweep",     # the launcher only; TensorFlow loads in its workers
+}
+
+_PROBE = """
+import json, sys, time
+t = time.perf_counter()
+import {module}
+dt = time.perf_counter() - t
+print(json.dumps({{"seconds": dt, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def time_help(repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "src.cli", "--help"], cwd=PROJECT_ROOT, check=True, capture_output=True)
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def time_import(module: str, repeat: int) -> dict:
+    best = None
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=PROJECT_ROOT, check=True, capture_output=True, text=True,
+        )
+        res = json.loads(out.stdout.strip().splitlines()[-1])
+        if best is None or res["seconds"] < best["seconds"]:
+            best = res
+    return best
+
+
+def main(repeat: int = 3) -> int:
+    failures = []
+
+    dt = time_help(repeat)
+    status = "ok" if dt <= HELP_BUDGET else "SLOW"
+    print(f"{status:<5} collusion --help            {dt:6.3f}s (budget {HELP_BUDGET:.1f}s)")
+    if dt > HELP_BUDGET:
+        failures.append("--help")
+
+    for stage, module in NUMPY_STAGES.items():
+        res = time_import(module, repeat)
+        ok = res["seconds"] <= STAGE_BUDGET and not res["heavy"]
+        heavy = f" imports {', '.join(res['heavy'])}" if res["heavy"] else ""
+        print(f"{'ok' if ok else 'FAIL':<5} {stage:<10} {module:<34} {res['seconds']:6.3f}s (budget {STAGE_BUDGET:.1f}s){heavy}")
+        if not ok:
+            failures.append(stage)
+
+    if failures:
+        print(f"Startup budget exceeded: {', '.join(failures)}")
+        return 1
+    print("Startup within budget.")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fail when CLI startup or NumPy-only stage imports exceed their budget.")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement (best is kept)")
+    args = parser.parse_args()
+    sys.exit(main(repeat=args.repeat))
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+from src.scoring.conduct_axis import score_centered
+
+# Scoring without TensorFlow: train_ae exports the scaler and the encoder's Dense
+# weights to encoder_L{L}.npz, run_scoring adds the conduct axis (mu_C, v_hat) and
+# writes scorer_L{L}.npz. Both load with np.load, no pickle.
+
+ACTIVATIONS = {
+    "relu": lambda h: np.maximum(h, 0.0, out=h),
+    "linear": lambda h: h,
+}
+
+
+def export_bundle(path: Path, scaler, encoder, features: Sequence[str]) -> Path:
+    """Write a fitted StandardScaler and a Keras Dense encoder to an .npz bundle."""
+    dense = [layer for layer in encoder.layers if layer.get_weights()]
+    arrays = {
+        "features": np.asarray(features, dtype=str),
+        "scaler_mean": np.asarray(scaler.mean_, dtype=np.float64),
+        "scaler_scale": np.asarray(scaler.scale_, dtype=np.float64),
+        "activations": np.asarray([layer.activation.__name__ for layer in dense], dtype=str),
+    }
+    for i, layer in enumerate(dense):
+        W, b = layer.get_weights()
+        arrays[f"W{i}"], arrays[f"b{i}"] = W, b
+
+    unknown = set(arrays["activations"]) - set(ACTIVATIONS)
+    if unknown:
+        raise ValueError(f"No NumPy implementation for activations {sorted(unknown)}")
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez(path, **arrays)
+    return path
+
+
+def add_axis(bundle: Path, out: Path, mu_C: np.ndarray, v_hat: np.ndarray) -> Path:
+    """Copy an encoder bundle to `out` with the conduct axis added."""
+    with np.load(bundle, allow_pickle=False) as data:
+        arrays = dict(data)
+    arrays["mu_C"] = np.asarray(mu_C, dtype=np.float64)
+    arrays["v_hat"] = np.asarray(v_hat, dtype=np.float64)
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    np.savez(out, **arrays)
+    return out
+
+
+class NumpyScorer:
+    """
+    scaler -> encoder -> conduct axis as batched float32 matmuls.
+
+    The scaler is folded into the first layer (W / scale, b - (mean / scale) @ W), so
+    each batch costs one matmul per Dense layer. Matches Keras' encoder.predict to
+    float32 round-off.
+    """
+
+    def __init__(
+        self,
+        weights: Sequence[np.ndarray],
+        biases: Sequence[np.ndarray],
+        activations: Sequence[str],
+        scaler_mean: np.ndarray,
+        scaler_scale: np.ndarray,
+        features: Sequence[str] = (),
+        mu_C: Optional[np.ndarray] = None,
+        v_hat: Optional[np.ndarray] = None,
+    ):
+        W0 = np.asarray(weights[0], dtype=np.float64)
+        inv = 1.0 / np.asarray(scaler_scale, dtype=np.float64)
+        weights = [W0 * inv[:, None]] + list(weights[1:])
+        biases = [np.asarray(biases[0], dtype=np.float64) - (np.asarray(scaler_mean) * inv) @ W0] + list(biases[1:])
+
+        self.weights = [np.asarray(W, dtype=np.float32) for W in weights]
+        self.biases = [np.asarray(b, dtype=np.float32) for b in biases]
+        self.activations = [ACTIVATIONS[str(a)] for a in activations]
+        self.features = [str(f) for f in features]
+        self.mu_C = mu_C
+        self.v_hat = v_hat
+
+    @classmethod
+    def load(cls, path: Path) -> "NumpyScorer":
+        with np.load(path, allow_pickle=False) as data:
+            n = len(data["activations"])
+            return cls(
+                [data[f"W{i}"] for i in range(n)],
+                [data[f"b{i}"] for i in range(n)],
+                data["activations"],
+                data["scaler_mean"],
+                data["scaler_scale"],
+                data["features"],
+                data["mu_C"] if "mu_C" in data else None,
+                data["v_hat"] if "v_hat" in data else None,
+            )
+
+    def encode(self, X: np.ndarray, batch_size: int = 65_536) -> np.ndarray:
+        """Latent codes of raw (unscaled) feature rows."""
+        X = np.asarray(X, dtype=np.float32)
+        Z = np.empty((len(X), self.weights[-1].shape[1]), dtype=np.float32)
+        for start in range(0, len(X), batch_size):
+            h = X[start:start + batch_size]
+            for W, b, act in zip(self.weights, self.biases, self.activations):
+                h = h @ W
+                h += b
+                h = act(h)
+            Z[start:start + batch_size] = h
+        return Z
+
+    def score(self, Z: np.ndarray) -> np.ndarray:
+        """Centered conduct score of latent codes (needs a bundle with the axis)."""
+        if self.mu_C is None or self.v_hat is None:
+            raise ValueError("Bundle has no conduct axis; score with scorer_L{L}.npz from run_scoring")
+        return score_centered(Z, self.mu_C, self.v_hat)
@@ -1,7 +1,5 @@
 import numpy as np
 import pandas as pd
-import joblib
-from tensorflow import keras
 
 import sys
 from pathlib import Path
@@ -13,33 +11,23 @@ if str(PROJECT_ROOT) not in sys.path:
 from src.utils.paths import run_dir
 from src.utils.config import load_tier0_config
 from src.scoring.conduct_axis import compute_centroids, compute_axis, score_centered
+from src.utils.schema import DtypePolicy, apply_dtype_policy, dtype_policy_from_config
+from src.data.run_feature import read_features
+from src.data.feature_registry import FEATURES_5
+from src.scoring.numpy_scorer import NumpyScorer, add_axis
 
-FEATURES_5 = ["volatility", "zero_change_fraction", "max_abs_ret", "AR_1", "price_range"]
+def score_features(df: pd.DataFrame, bundle: Path) -> tuple:
+    """
+    Add z1, z2 and conduct_score_centered to df (in place) with the encoder in `bundle`.
 
-def main():
-    experiment = "dgp0"
-    _, raw_cfg = load_tier0_config("configs/dgp0.yaml")
-    seed = raw_cfg["simulation"]["seed"]
-
-    mode = "baseline"
-    L = 18
-
-    base_model = run_dir(experiment, seed, mode)
-    base_feat = run_dir(experiment, seed, "baseline")
-
-    # Load features
-    feat_path = base_feat / "data" / "features" / f"features_L{L}.parquet"
-    df = pd.read_parquet(feat_path).dropna(subset=FEATURES_5).copy()
-
-    # Load scaler + encoder
-    model_dir = base_model / "model"
-    scaler = joblib.load(model_dir / f"scaler_L{L}.pkl")
-    encoder = keras.models.load_model(model_dir / f"encoder_L{L}.keras")
+    The conduct axis runs from the competitive to the cartel centroid of the pure
+    windows. Returns (df, mu_C, mu_K, v_hat).
+    """
+    # Scaler + encoder from the NumPy bundle exported by train_ae (no TensorFlow)
+    scorer = NumpyScorer.load(bundle)
 
     X = df[FEATURES_5].to_numpy().astype(np.float32)
-    Xs = scaler.transform(X).astype(np.float32)
-
-    Z = encoder.predict(Xs, batch_size=1024, verbose=0)
+    Z = scorer.encode(X)
     df["z1"] = Z[:, 0]
     df["z2"] = Z[:, 1]
 
@@ -51,17 +39,51 @@ def main():
     # Centered conduct score
     Z2 = df[["z1", "z2"]].to_numpy()
     df["conduct_score_centered"] = score_centered(Z2, mu_C, v_hat)
+    return df, mu_C, mu_K, v_hat
+
+
+def score(
+    experiment: str, seed: int, mode: str, feat_mode: str, L: int, policy: DtypePolicy,
+    feature_engine: str = "windows",
+) -> Path:
+    """
+    Score feat_mode's length-L features with the model trained on `mode`; artifacts are
+    written to feat_mode's scoring/ folder.
+    """
+    base_model = run_dir(experiment, seed, mode)
+    base_feat = run_dir(experiment, seed, feat_mode)
+
+    # Load features
+    df = read_features(base_feat, L, feature_engine).dropna(subset=FEATURES_5).copy()
+
+    bundle = base_model / "model" / f"encoder_L{L}.npz"
+    df, mu_C, mu_K, v_hat = score_features(df, bundle)
 
     # Save artifacts
     score_dir = base_feat / "scoring"
     score_dir.mkdir(parents=True, exist_ok=True)
 
-    df.to_parquet(score_dir / f"scoring_L{L}.parquet", index=False)
+    apply_dtype_policy(df, policy).to_parquet(score_dir / f"scoring_L{L}.parquet", index=False)
     np.save(score_dir / f"mu_C_L{L}.npy", mu_C)
     np.save(score_dir / f"mu_K_L{L}.npy", mu_K)
     np.save(score_dir / f"v_hat_L{L}.npy", v_hat)
+    add_axis(bundle, score_dir / f"scorer_L{L}.npz", mu_C, v_hat)
 
     print("Saved scoring artifacts in:", score_dir)
+    return score_dir
+
+
+def main():
+    experiment = "dgp0"
+    _, raw_cfg = load_tier0_config("configs/dgp0.yaml")
+    seed = raw_cfg["simulation"]["seed"]
+    policy = dtype_policy_from_config(raw_cfg)
+    feature_engine = raw_cfg.get("features", {}).get("engine", "windows")
+
+    mode = "baseline"
+    L = 18
+
+    score(experiment, seed, mode, "baseline", L, policy, feature_engine)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
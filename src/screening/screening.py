@@ -1,23 +1,37 @@
 import pandas as pd
 import numpy as np
 
+from src.utils.jit import jit_kernel
 
-def longest_run(mask: pd.Series) -> int:
-    """
-    Longest consecutive run of True values in a boolean Series.
-    """
+
+def _longest_run_loop(mask):
+    # loop kernel for Numba
     max_run = 0
     current = 0
-
     for val in mask:
         if val:
             current += 1
             max_run = max(max_run, current)
         else:
             current = 0
-
     return max_run
 
+
+@jit_kernel(_longest_run_loop)
+def _longest_run(mask: np.ndarray) -> int:
+    if not mask.any():
+        return 0
+    # run boundaries: rises and falls of the mask padded with False on both sides
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.view(np.int8), [0]))))
+    return int((edges[1::2] - edges[::2]).max())
+
+
+def longest_run(mask: pd.Series) -> int:
+    """
+    Longest consecutive run of True values in a boolean Series.
+    """
+    return int(_longest_run(np.ascontiguousarray(mask, dtype=np.bool_)))
+
 def compute_market_metrics(df: pd.DataFrame, tau95: float, tau99: float, time_col: str) -> pd.DataFrame:
     """
     Compute market-level screening metrics from window-level conduct scores.
@@ -2,10 +2,19 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, Tuple
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Sequence, Tuple
 import numpy as np
 import pandas as pd
 
+from src.simulation.markov import sample_markov_paths
+from src.simulation.recurrence import linear_recurrence
+
+# markets per independent random stream in the sharded engine; part of the
+# reproducibility key together with the seed
+DEFAULT_SHARD_SIZE = 1024
+
 
 @dataclass
 class Tier0Config:
@@ -137,20 +146,16 @@ def sample_market_params(rng: np.random.Generator, cfg: Tier0Config, mode: str =
     )
 
 
-def simulate_regime_path(rng: np.random.Generator, cfg: Tier0Config, T: int) -> np.ndarray:
-    """
-    Simulate the conduct regime path S_t using a 3-state Markov chain.
+# Starting distribution: mostly competitive, some tacit, very rare cartel start
+INITIAL_REGIME_PROBS = np.array([0.75, 0.20, 0.05])
 
-    States:
-        0 = Competitive (C)
-        1 = Tacit coordination (T)
-        2 = Cartel (K)
 
-    We use high "stay" probabilities so regimes occur in persistent episodes.
+def regime_transition_matrix(cfg: Tier0Config) -> np.ndarray:
+    """
+    Transition matrix P where P[i, j] = P(S_t=j | S_{t-1}=i) for the C/T/K chain.
     """
-    # Transition matrix P where P[i, j] = P(S_t=j | S_{t-1}=i)
     # These off-diagonal splits are just a reasonable default; we can tune later.
-    P = np.array([
+    return np.array([
         # from C: mostly stay competitive; occasionally move to T or K
         [cfg.stay_C, (1 - cfg.stay_C) * 0.70, (1 - cfg.stay_C) * 0.30],
         # from T: can drift back to C or escalate to K
@@ -159,16 +164,21 @@ def simulate_regime_path(rng: np.random.Generator, cfg: Tier0Config, T: int) ->
         [(1 - cfg.stay_K) * 0.60, (1 - cfg.stay_K) * 0.40, cfg.stay_K],
     ], dtype=float)
 
-    S = np.zeros(T, dtype=int)
 
-    # Starting distribution: mostly competitive, some tacit, very rare cartel start
-    S[0] = rng.choice([0, 1, 2], p=[0.75, 0.20, 0.05])
+def simulate_regime_path(rng: np.random.Generator, cfg: Tier0Config, T: int) -> np.ndarray:
+    """
+    Simulate the conduct regime path S_t using a 3-state Markov chain.
 
-    # Draw the Markov chain forward
-    for t in range(1, T):
-        S[t] = rng.choice([0, 1, 2], p=P[S[t - 1]])
+    States:
+        0 = Competitive (C)
+        1 = Tacit coordination (T)
+        2 = Cartel (K)
 
-    return S
+    We use high "stay" probabilities so regimes occur in persistent episodes.
+    The path is bit-identical to drawing each step with rng.choice(p=P[S[t-1]]).
+    """
+    P = regime_transition_matrix(cfg)
+    return sample_markov_paths(P, INITIAL_REGIME_PROBS, 1, T, rng=rng)[0]
 
 
 def simulate_market_series(
@@ -255,10 +265,33 @@ def simulate_market_series(
     return df, params
 
 
-def simulate_panel(cfg: Tier0Config, n_markets: int, seed: int = 42, mode:str="baseline") -> pd.DataFrame:
+def simulate_panel(
+    cfg: Tier0Config,
+    n_markets: int,
+    seed: int = 42,
+    mode: str = "baseline",
+    engine: str = "loop",
+    workers: int = 1,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+) -> pd.DataFrame:
     """
     Simulate many markets and stack into one DataFrame.
+
+    engine="loop" reproduces the original market-by-market simulation.
+    engine="batched" simulates all markets together (see simulate_panel_batched);
+    it draws random numbers in a different order, so panels differ from "loop".
+    engine="sharded" runs the batched engine on SeedSequence-spawned shards across
+    `workers` processes (see simulate_panel_sharded).
     """
+    if engine == "batched":
+        return simulate_panel_batched(cfg, n_markets, seed=seed, mode=mode)
+    if engine == "sharded":
+        return simulate_panel_sharded(
+            cfg, n_markets, seed=seed, mode=mode, shard_size=shard_size, workers=workers
+        )
+    if engine != "loop":
+        raise ValueError(f"Unknown simulation engine: {engine}")
+
     rng = np.random.default_rng(seed)
     dfs = []
     param_rows = []
@@ -280,4 +313,359 @@ def simulate_panel(cfg: Tier0Config, n_markets: int, seed: int = 42, mode:str="b
     panel = pd.concat(dfs, axis=0, ignore_index=True)
     params_df = pd.DataFrame(param_rows)
 
-    return panel, params_df
\ No newline at end of file
+    return panel, params_df
+
+
+# ---------------------------------------------------------------------------
+# Batched engine: all markets simulated together as (markets x time) arrays
+# ---------------------------------------------------------------------------
+
+REGIMES = ("C", "T", "K")
+
+
+def apply_mode_overrides_batch(params: Dict, mode: str) -> Dict:
+    """
+    Vectorized counterpart of the stress test overrides in sample_market_params.
+
+    beta and kappa are (n_markets, 3) arrays with columns ordered as REGIMES.
+    """
+    beta = params["beta"]
+    kappa = params["kappa"]
+    n_markets = beta.shape[0]
+
+    sigma_c = params["sigma_c"]
+    jump_prob = params["jump_prob"]
+    sigma_J = params["sigma_J"]
+    mu_c = np.zeros(n_markets, dtype=float)
+
+    # column 0 holds the competitive draw; broadcasting it fixes the parameter
+    if mode == "kappa_only":
+        beta = np.repeat(beta[:, :1], 3, axis=1)
+
+    elif mode == "beta_only":
+        kappa = np.repeat(kappa[:, :1], 3, axis=1)
+
+    elif mode == "calm_fundamentals":
+        beta = np.repeat(beta[:, :1], 3, axis=1)
+        kappa = np.repeat(kappa[:, :1], 3, axis=1)
+
+        sigma_c = np.minimum(sigma_c, 0.005)
+        jump_prob = np.minimum(jump_prob, 0.002)
+        sigma_J = np.minimum(sigma_J, 0.03)
+
+    elif mode == "trend_fundamentals":
+        beta = np.repeat(beta[:, :1], 3, axis=1)
+        kappa = np.repeat(kappa[:, :1], 3, axis=1)
+
+        mu_c = np.full(n_markets, 0.002)
+
+    elif mode != "baseline":
+        raise ValueError(f"Unknown stress test mode: {mode}")
+
+    return dict(
+        params,
+        sigma_c=sigma_c,
+        jump_prob=jump_prob,
+        sigma_J=sigma_J,
+        beta=beta,
+        kappa=kappa,
+        mu_c=mu_c,
+    )
+
+
+def sample_market_params_batch(
+    rng: np.random.Generator,
+    cfg: Tier0Config,
+    n_markets: int,
+    mode: str = "baseline",
+) -> Dict:
+    """
+    Sample structural parameters for n_markets markets at once.
+
+    Same distributions as sample_market_params, but every entry is a vector over
+    markets (beta and kappa are (n_markets, 3) arrays ordered as REGIMES).
+    """
+    params = dict(
+        rho_c=rng.uniform(cfg.rho_c_low, cfg.rho_c_high, n_markets),
+        sigma_c=rng.uniform(cfg.sigma_c_low, cfg.sigma_c_high, n_markets),
+        jump_prob=rng.uniform(cfg.jump_prob_low, cfg.jump_prob_high, n_markets),
+        sigma_J=rng.uniform(cfg.sigma_J_low, cfg.sigma_J_high, n_markets),
+        sigma_p=rng.uniform(cfg.sigma_p_low, cfg.sigma_p_high, n_markets),
+        beta=np.column_stack([
+            rng.uniform(*cfg.beta_C, n_markets),
+            rng.uniform(*cfg.beta_T, n_markets),
+            rng.uniform(*cfg.beta_K, n_markets),
+        ]),
+        kappa=np.column_stack([
+            rng.uniform(*cfg.kappa_C, n_markets),
+            rng.uniform(*cfg.kappa_T, n_markets),
+            rng.uniform(*cfg.kappa_K, n_markets),
+        ]),
+    )
+    return apply_mode_overrides_batch(params, mode)
+
+
+def simulate_regime_paths(
+    rng: np.random.Generator,
+    cfg: Tier0Config,
+    n_markets: int,
+    T: int,
+) -> np.ndarray:
+    """
+    Simulate regime paths for n_markets markets; returns an (n_markets, T) int array.
+
+    Uniforms are consumed market by market, so market m gets the same path as
+    simulate_regime_path would from the same stream position.
+    """
+    P = regime_transition_matrix(cfg)
+    return sample_markov_paths(P, INITIAL_REGIME_PROBS, n_markets, T, rng=rng)
+
+
+def draw_market_batch(rng: np.random.Generator, cfg: Tier0Config, n_markets: int) -> Dict:
+    """
+    Draw every random input of the batched engine for n_markets markets.
+
+    Nothing here depends on the stress test mode: parameters are drawn before the
+    mode overrides, and shocks are standard normals / uniforms that each mode scales
+    or thresholds with its own parameters. All modes can therefore be derived from
+    one set of draws (common random numbers).
+    """
+    T_total = cfg.burn_in + cfg.T
+
+    params = sample_market_params_batch(rng, cfg, n_markets, mode="baseline")
+    S = simulate_regime_paths(rng, cfg, n_markets, T_total)
+
+    return dict(
+        params=params,
+        S=S,
+        z_c=rng.standard_normal((n_markets, T_total - 1)),   # regular cost shocks
+        u_J=rng.random((n_markets, T_total - 1)),            # jump indicators
+        z_J=rng.standard_normal((n_markets, T_total - 1)),   # jump sizes
+        z_p=rng.standard_normal((n_markets, T_total - 1)),   # price noise
+    )
+
+
+def simulate_cost_paths(params: Dict, draws: Dict) -> np.ndarray:
+    """
+    Latent AR(1) cost paths with jumps for all markets; returns (n_markets, T).
+    """
+    shock = params["sigma_c"][:, None] * draws["z_c"]
+    shock += np.where(
+        draws["u_J"] < params["jump_prob"][:, None],
+        params["sigma_J"][:, None] * draws["z_J"],
+        0.0,
+    )
+
+    # c_t = rho * c_{t-1} + (mu + shocks_t); column 0 of the input is the start
+    drift = params["mu_c"][:, None] + shock
+    return linear_recurrence(params["rho_c"][:, None], np.pad(drift, ((0, 0), (1, 0))))
+
+
+def simulate_price_paths(params: Dict, S: np.ndarray, c: np.ndarray, z_p: np.ndarray) -> np.ndarray:
+    """
+    Partial-adjustment log price paths for all markets; returns (n_markets, T).
+    """
+    # per-cell regime parameters
+    kappa = np.take_along_axis(params["kappa"], S, axis=1)
+    beta = np.take_along_axis(params["beta"], S, axis=1)
+
+    eps = params["sigma_p"][:, None] * z_p
+
+    # p_t = (1 - kappa_t) * p_{t-1} + (kappa_t * beta_t * c_t + eps_t)
+    drive = kappa * (beta * c)
+    drive[:, 1:] += eps
+    return linear_recurrence(1 - kappa, drive)
+
+
+def evolve_market_batch(
+    cfg: Tier0Config,
+    draws: Dict,
+    mode: str = "baseline",
+    first_market_id: int = 0,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Turn one batch of draws into (panel, params_df) for a single stress test mode.
+
+    Markets are numbered first_market_id .. first_market_id + n_markets - 1.
+    """
+    params = apply_mode_overrides_batch(draws["params"], mode)
+
+    #sanity check
+    if first_market_id == 0:
+        print(f"\nMode: {mode}")
+        print("beta:", dict(zip(REGIMES, params["beta"][0].tolist())))
+        print("kappa:", dict(zip(REGIMES, params["kappa"][0].tolist())))
+        print("mu_c:", float(params["mu_c"][0]))
+
+    S = draws["S"]
+    c = simulate_cost_paths(params, draws)
+    p = simulate_price_paths(params, S, c, draws["z_p"])
+
+    # Drop burn-in
+    S = S[:, cfg.burn_in:]
+    c = c[:, cfg.burn_in:]
+    p = p[:, cfg.burn_in:]
+
+    n_markets = S.shape[0]
+    market_ids = np.arange(first_market_id, first_market_id + n_markets)
+
+    panel = pd.DataFrame({
+        "market_id": np.repeat(market_ids, cfg.T),
+        "t": np.tile(np.arange(cfg.T), n_markets),
+        "S": S.ravel(),   # 0=C, 1=T, 2=K
+        "c": c.ravel(),
+        "p": p.ravel(),
+    })
+
+    params_df = pd.DataFrame({"market_id": market_ids})
+    for j, s in enumerate(REGIMES):
+        params_df[f"beta_{s}"] = params["beta"][:, j]
+    for j, s in enumerate(REGIMES):
+        params_df[f"kappa_{s}"] = params["kappa"][:, j]
+
+    return panel, params_df
+
+
+def simulate_market_batch(
+    rng: np.random.Generator,
+    cfg: Tier0Config,
+    n_markets: int,
+    modes: Sequence[str] = ("baseline",),
+    first_market_id: int = 0,
+) -> Dict[str, Tuple[pd.DataFrame, pd.DataFrame]]:
+    """
+    Simulate a batch of markets from one stream for every mode in `modes`.
+
+    The draws are made once and shared, so each mode costs only its recursions and
+    the modes are paired market by market. Returns {mode: (panel, params_df)}; each
+    entry equals what a single-mode call would produce from the same stream.
+    """
+    draws = draw_market_batch(rng, cfg, n_markets)
+    return {
+        mode: evolve_market_batch(cfg, draws, mode=mode, first_market_id=first_market_id)
+        for mode in modes
+    }
+
+
+def simulate_panel_batched(
+    cfg: Tier0Config,
+    n_markets: int,
+    seed: int = 42,
+    mode: str = "baseline",
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Simulate all markets together and build the long panel once at the end.
+
+    Same DGP and output layout as simulate_panel(engine="loop"), but parameters,
+    regimes, costs and prices are (markets x time) arrays, so the Python-level work
+    scales with T rather than with n_markets * T.
+    """
+    rng = np.random.default_rng(seed)
+    return simulate_market_batch(rng, cfg, n_markets, modes=(mode,))[mode]
+
+
+# ---------------------------------------------------------------------------
+# Sharded engine: independent SeedSequence streams, one per shard of markets
+# ---------------------------------------------------------------------------
+
+def shard_bounds(n_markets: int, shard_size: int = DEFAULT_SHARD_SIZE) -> List[Tuple[int, int]]:
+    """Split market ids 0..n_markets-1 into consecutive [start, stop) shards."""
+    if shard_size < 1:
+        raise ValueError("shard_size must be positive")
+    return [(s, min(s + shard_size, n_markets)) for s in range(0, n_markets, shard_size)]
+
+
+def _simulate_shard(args) -> Dict[str, Tuple[pd.DataFrame, pd.DataFrame]]:
+    """Process-pool entry point: simulate one shard from its own child stream."""
+    cfg, seed_seq, start, stop, modes = args
+    rng = np.random.default_rng(seed_seq)
+    return simulate_market_batch(rng, cfg, stop - start, modes=modes, first_market_id=start)
+
+
+def iter_panel_shards(
+    cfg: Tier0Config,
+    n_markets: int,
+    seed: int = 42,
+    modes: Sequence[str] = ("baseline",),
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    workers: int = 1,
+) -> Iterator[Dict[str, Tuple[pd.DataFrame, pd.DataFrame]]]:
+    """
+    Yield {mode: (panel, params_df)} per shard of markets, in market order.
+
+    Each shard of shard_size markets gets its own child stream spawned from
+    SeedSequence(seed), so the output depends only on (seed, shard_size) and is
+    bit-identical for any number of workers. workers > 1 runs shards in a
+    process pool with at most 2 * workers shards held at once. All modes of a
+    shard share the same draws (common random numbers).
+    """
+    modes = tuple(modes)
+    bounds = shard_bounds(n_markets, shard_size)
+    children = np.random.SeedSequence(seed).spawn(len(bounds))
+    tasks = [(cfg, ss, start, stop, modes) for ss, (start, stop) in zip(children, bounds)]
+
+    if workers <= 1:
+        for task in tasks:
+            yield _simulate_shard(task)
+        return
+
+    # keep a bounded number of shards in flight so finished shards do not pile up
+    # in memory while the consumer (e.g. a streaming writer) catches up
+    max_pending = 2 * workers
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(_simulate_shard, task))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def simulate_panel_sharded(
+    cfg: Tier0Config,
+    n_markets: int,
+    seed: int = 42,
+    mode: str = "baseline",
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    workers: int = 1,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Simulate the panel shard by shard (optionally in parallel) and stack the shards.
+    """
+    return simulate_panel_modes(
+        cfg, n_markets, seed=seed, modes=(mode,), shard_size=shard_size, workers=workers
+    )[mode]
+
+
+def simulate_panel_modes(
+    cfg: Tier0Config,
+    n_markets: int,
+    seed: int = 42,
+    modes: Sequence[str] = ("baseline",),
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    workers: int = 1,
+) -> Dict[str, Tuple[pd.DataFrame, pd.DataFrame]]:
+    """
+    Simulate several stress test modes with common random numbers (sharded engine).
+
+    Regime paths, shock innovations and jump indicators are drawn once per shard and
+    every mode's costs and prices are derived from them. Each mode's panel equals
+    simulate_panel_sharded for that mode; comparisons across modes are paired.
+    """
+    panels = {mode: [] for mode in modes}
+    params = {mode: [] for mode in modes}
+    for shard in iter_panel_shards(
+        cfg, n_markets, seed=seed, modes=modes, shard_size=shard_size, workers=workers
+    ):
+        for mode, (panel, params_df) in shard.items():
+            panels[mode].append(panel)
+            params[mode].append(params_df)
+
+    return {
+        mode: (
+            pd.concat(panels[mode], axis=0, ignore_index=True),
+            pd.concat(params[mode], axis=0, ignore_index=True),
+        )
+        for mode in modes
+    }
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from typing import Optional
+import numpy as np
+
+
+def cumulative_rows(P: np.ndarray) -> np.ndarray:
+    """
+    Validate a K-state transition (or initial) distribution and return its row-wise CDF.
+
+    Rows are normalized so the last cumulative entry is exactly 1.0, matching the
+    normalization rng.choice applies to its p argument.
+    """
+    P = np.asarray(P, dtype=float)
+    if np.any(P < 0):
+        raise ValueError("Transition probabilities must be non-negative")
+    if not np.allclose(P.sum(axis=-1), 1.0):
+        raise ValueError("Transition probabilities must sum to 1 along each row")
+
+    cum = np.cumsum(P, axis=-1)
+    cum /= cum[..., -1:]
+    return cum
+
+
+def sample_markov_paths(
+    P: np.ndarray,
+    p0: np.ndarray,
+    n_chains: int,
+    T: int,
+    rng: Optional[np.random.Generator] = None,
+    uniforms: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Sample n_chains paths of a K-state Markov chain; returns an (n_chains, T) int array.
+
+    P[i, j] = P(S_t=j | S_{t-1}=i) is any K x K row-stochastic matrix and p0 the
+    length-K starting distribution. All uniforms are drawn up front as an
+    (n_chains, T) block (or passed in via `uniforms`) and mapped through the
+    cumulative rows, stepping every chain forward at once.
+
+    Reproducible mode: uniforms are laid out chain by chain, and each one is mapped
+    exactly as rng.choice(K, p=row) maps its single uniform. A chain sampled from
+    `rng` is therefore bit-identical to drawing it with one rng.choice call per step.
+    """
+    cum_P = cumulative_rows(P)
+    cum_0 = cumulative_rows(p0)
+    K = cum_P.shape[0]
+    if cum_P.shape != (K, K) or cum_0.shape != (K,):
+        raise ValueError("P must be K x K and p0 must have length K")
+
+    if uniforms is None:
+        if rng is None:
+            raise ValueError("Either rng or uniforms must be provided")
+        uniforms = rng.random((n_chains, T))
+    elif uniforms.shape != (n_chains, T):
+        raise ValueError(f"uniforms must have shape {(n_chains, T)}, got {uniforms.shape}")
+
+    S = np.empty((n_chains, T), dtype=int)
+    if T == 0:
+        return S
+
+    S[:, 0] = np.searchsorted(cum_0, uniforms[:, 0], side="right")
+
+    # number of cumulative probabilities <= u is the sampled state (searchsorted "right")
+    for t in range(1, T):
+        S[:, t] = (cum_P[S[:, t - 1]] <= uniforms[:, t, None]).sum(axis=1)
+
+    return S
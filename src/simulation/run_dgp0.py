@@ -1,35 +1,125 @@
+import argparse
 import sys
+from contextlib import ExitStack
 from pathlib import Path
 
+import numpy as np
+
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.append(str(PROJECT_ROOT))
 
 from src.utils.config import load_tier0_config
-from src.simulation.dgp0 import simulate_panel
+from src.simulation.dgp0 import (
+    simulate_panel, simulate_panel_modes, simulate_market_batch, iter_panel_shards, DEFAULT_SHARD_SIZE,
+)
 from src.utils.paths import run_dir
+from src.utils.parquet_io import ParquetStreamWriter
+from src.utils.schema import DtypePolicy, apply_dtype_policy, dtype_policy_from_config
 
 
+MODES = ["baseline", "kappa_only", "beta_only", "calm_fundamentals", "trend_fundamentals"]
 
-def main():
-    cfg, raw_cfg = load_tier0_config("configs/dgp0.yaml")
 
+def stream_modes(
+    cfg, experiment: str, seed: int, modes, n_markets: int, shard_size: int, workers: int, policy: DtypePolicy
+):
+    """
+    Write every mode's panel shard by shard as Parquet row groups while it is simulated.
+
+    All modes share each shard's draws (common random numbers). Produces the same
+    files as the in-memory path, with memory bounded by shard_size.
+    """
+    with ExitStack() as stack:
+        writers = {}
+        for mode in modes:
+            out_dir = run_dir(experiment, seed, mode) / "data"
+            writers[mode] = (
+                stack.enter_context(ParquetStreamWriter(out_dir / "series.parquet")),
+                stack.enter_context(ParquetStreamWriter(out_dir / "market_params.parquet")),
+            )
+
+        for shard in iter_panel_shards(
+            cfg, n_markets, seed=seed, modes=modes, shard_size=shard_size, workers=workers
+        ):
+            for mode, (panel, params_df) in shard.items():
+                series_w, params_w = writers[mode]
+                series_w.write(apply_dtype_policy(panel, policy))
+                params_w.write(apply_dtype_policy(params_df, policy))
+
+    for series_w, _ in writers.values():
+        print("Saved:", series_w.path, f"{series_w.rows} rows")
+
+
+def save_mode(experiment: str, seed: int, mode: str, df, params_df, policy: DtypePolicy):
+    out_dir = run_dir(experiment, seed, mode) / "data"
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    apply_dtype_policy(df, policy)
+    apply_dtype_policy(params_df, policy)
+
+    out = out_dir / "series.parquet"
+    df.to_parquet(out, index=False)
+    params_df.to_parquet(out_dir / "market_params.parquet", index=False)
+    print("Saved:", out, df.shape)
+
+
+def simulate_modes(cfg, raw_cfg: dict, modes, experiment: str = "dgp0", workers: int | None = None):
+    """
+    Simulate the given stress test modes and write series.parquet / market_params.parquet
+    under each mode's run folder, using the engine settings of the `simulation` config.
+    """
     n_markets = raw_cfg["simulation"]["n_markets"]
     seed = raw_cfg["simulation"]["seed"]
+    engine = raw_cfg["simulation"].get("engine", "loop")
+    shard_size = raw_cfg["simulation"].get("shard_size", DEFAULT_SHARD_SIZE)
+    if workers is None:
+        workers = raw_cfg["simulation"].get("workers", 1)
+    if workers > 1 and engine != "sharded":
+        raise ValueError(f"workers > 1 requires engine 'sharded', config has '{engine}'")
+    policy = dtype_policy_from_config(raw_cfg)
+    stream = raw_cfg["simulation"].get("stream", False)
+    if stream and engine != "sharded":
+        raise ValueError(f"stream requires engine 'sharded', config has '{engine}'")
+
+    if stream:
+        stream_modes(cfg, experiment, seed, modes, n_markets, shard_size, workers, policy)
+        return
+
+    # batched engines draw once and derive every mode (common random numbers)
+    if engine == "sharded":
+        panels = simulate_panel_modes(
+            cfg, n_markets, seed=seed, modes=modes, shard_size=shard_size, workers=workers
+        )
+    elif engine == "batched":
+        panels = simulate_market_batch(np.random.default_rng(seed), cfg, n_markets, modes=modes)
+    else:
+        panels = None
+
+    if panels is not None:
+        for mode, (df, params_df) in panels.items():
+            save_mode(experiment, seed, mode, df, params_df, policy)
+        return
+
+    # loop engine: draws depend on the mode, so each mode is simulated separately
+    for mode in modes:
+        df, params_df = simulate_panel(cfg, n_markets=n_markets, seed=seed, mode=mode, engine=engine)
+        save_mode(experiment, seed, mode, df, params_df, policy)
+
+
+def main(workers: int | None = None):
+    cfg, raw_cfg = load_tier0_config("configs/dgp0.yaml")
 
     #experiment
     experiment = "dgp0"
 
-    
-    for mode in ["baseline", "kappa_only", "beta_only", "calm_fundamentals", "trend_fundamentals"]:
-        df, params_df = simulate_panel(cfg, n_markets=n_markets, seed=seed, mode=mode)
-        out_dir = run_dir(experiment, seed, mode) / "data"
-        out_dir.mkdir(parents=True, exist_ok=True)
-
-        out = out_dir / "series.parquet"
-        df.to_parquet(out, index=False)
-        params_df.to_parquet(out_dir / "market_params.parquet", index=False)
-        print("Saved:", out, df.shape)
+    simulate_modes(cfg, raw_cfg, MODES, experiment=experiment, workers=workers)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Simulate Tier 0 panels for every stress test mode.")
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="processes for the sharded engine (default: simulation.workers in the config)",
+    )
+    args = parser.parse_args()
+    main(workers=args.workers)
@@ -13,6 +13,12 @@ from src.utils.paths import run_dir
 from src.utils.config import load_tier0_config
 from src.simulation.validation import separation_auc_like
 
+def a6_metric(df: pd.DataFrame, seed: int) -> float:
+    """A6 = P(score_K > score_C) of the centered conduct scores (only meaningful when both C and K exist)."""
+    scores_C = df[df["state_mode"] == 0]["conduct_score_centered"].dropna().to_numpy()
+    scores_K = df[df["state_mode"] == 2]["conduct_score_centered"].dropna().to_numpy()
+    return separation_auc_like(scores_C, scores_K, n=10000, seed=seed)
+
 def main():
     experiment = "dgp0"
     _, raw_cfg = load_tier0_config("configs/dgp0.yaml")
@@ -25,11 +31,7 @@ def main():
     score_path = base / "scoring" / f"scoring_L{L}.parquet"
     df = pd.read_parquet(score_path)
 
-    # A6 metric (only meaningful when both C and K exist)
-    scores_C = df[df["state_mode"] == 0]["conduct_score_centered"].dropna().to_numpy()
-    scores_K = df[df["state_mode"] == 2]["conduct_score_centered"].dropna().to_numpy()
-
-    a6 = separation_auc_like(scores_C, scores_K, n=10000, seed=seed)
+    a6 = a6_metric(df, seed)
 
     # Summary table
     summary = df.groupby("state_mode")["conduct_score_centered"].describe()
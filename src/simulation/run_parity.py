@@ -0,0 +1,165 @@
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+
+from src.simulation.dgp0 import (
+    Tier0Config, draw_market_batch, apply_mode_overrides_batch, simulate_cost_paths, simulate_price_paths,
+)
+from src.simulation.recurrence import (
+    linear_recurrence, linear_recurrence_blocked, linear_recurrence_loop, linear_recurrence_jit, _recurrence_rows,
+)
+from src.data.feature_eng import _autocorr_rows, _kurtosis_rows
+from src.data.feature_registry import FEATURES_5
+from src.screening.screening import _longest_run
+from src.scoring.numpy_scorer import NumpyScorer, export_bundle
+from src.utils.jit import jit_available, jit_compile, jit_enabled
+
+RTOL = 1e-10
+ATOL = 1e-12
+
+
+def check(
+    name: str, expected: np.ndarray, actual: np.ndarray, rtol: float = RTOL, atol: float = ATOL, exact: bool = False
+):
+    expected, actual = np.asarray(expected, dtype=float), np.asarray(actual, dtype=float)
+    if not np.array_equal(np.isnan(expected), np.isnan(actual)):
+        raise AssertionError(f"{name}: NaN positions differ")
+    err = float(np.nanmax(np.abs(expected - actual))) if np.any(~np.isnan(expected)) else 0.0
+    if exact and not np.array_equal(expected, actual, equal_nan=True):
+        raise AssertionError(f"{name}: not bit-identical, max abs diff {err:.3e}")
+    if not np.allclose(expected, actual, rtol=rtol, atol=atol, equal_nan=True):
+        raise AssertionError(f"{name}: max abs diff {err:.3e}")
+    print(f"ok  {name:<45} max abs diff {err:.3e}")
+
+
+def check_recurrence(rng: np.random.Generator):
+    """Fast recurrence kernels vs the time-stepped loop, incl. zero coefficients and long T."""
+    for n, T in [(1, 1), (3, 2), (5, 7), (200, 204), (2, 50_000)]:
+        a = rng.uniform(0.0, 1.0, (n, T))
+        a[:, ::17] = 0.0
+        b = rng.normal(size=(n, T))
+        ref = linear_recurrence_loop(a, b, x0=0.3)
+
+        check(f"blocked n={n} T={T}", ref, linear_recurrence_blocked(a, b, x0=0.3))
+        check(f"blocked block=3 n={n} T={T}", ref, linear_recurrence_blocked(a, b, x0=0.3, block=3))
+        check(f"auto n={n} T={T}", ref, linear_recurrence(a, b, x0=0.3), exact=True)
+
+
+def check_dgp_paths(rng: np.random.Generator):
+    """Batched cost/price paths vs the per-market, per-month loop of simulate_market_series."""
+    cfg = Tier0Config()
+    draws = draw_market_batch(rng, cfg, 20)
+
+    for mode in ["baseline", "trend_fundamentals"]:
+        params = apply_mode_overrides_batch(draws["params"], mode)
+        S = draws["S"]
+        c = simulate_cost_paths(params, draws)
+        p = simulate_price_paths(params, S, c, draws["z_p"])
+
+        n_markets, T = S.shape
+        c_ref = np.zeros((n_markets, T))
+        p_ref = np.zeros((n_markets, T))
+        for m in range(n_markets):
+            sigma_c, sigma_J = params["sigma_c"][m], params["sigma_J"][m]
+            for t in range(1, T):
+                u = sigma_c * draws["z_c"][m, t - 1]
+                jump = sigma_J * draws["z_J"][m, t - 1] if draws["u_J"][m, t - 1] < params["jump_prob"][m] else 0.0
+                c_ref[m, t] = params["rho_c"][m] * c_ref[m, t - 1] + params["mu_c"][m] + u + jump
+            for t in range(1, T):
+                kappa = params["kappa"][m, S[m, t]]
+                beta = params["beta"][m, S[m, t]]
+                eps = params["sigma_p"][m] * draws["z_p"][m, t - 1]
+                p_ref[m, t] = (1 - kappa) * p_ref[m, t - 1] + kappa * (beta * c_ref[m, t]) + eps
+
+        check(f"cost paths ({mode})", c_ref, c)
+        check(f"price paths ({mode})", p_ref, p)
+
+
+def check_jit_kernels(rng: np.random.Generator):
+    """
+    Loop kernels of the JIT backend vs their NumPy versions.
+
+    The recurrence loop must be bit-identical to the reference loop; the feature
+    kernels sum in a different order and agree to RTOL.
+    The loops always run interpreted, so minimal environments still check them; the
+    Numba-compiled versions are checked too when numba is installed.
+    """
+    a = rng.uniform(0.0, 1.0, (40, 60))
+    a[:, ::7] = 0.0
+    b = rng.normal(size=(40, 60))
+    ref = linear_recurrence_loop(a, b, x0=0.3)
+    x = np.empty_like(a)
+    x[:, 0] = 0.3
+    check("recurrence loop kernel", ref, _recurrence_rows(a, b, x), exact=True)
+
+    # windowed returns with sticky (zero), constant, missing and short rows
+    r = rng.normal(0.0, 0.05, (400, 23))
+    r[rng.random(r.shape) < 0.2] = 0.0
+    r[:20] = 0.01
+    r[20:60][rng.random((40, 23)) < 0.4] = np.nan
+    r[60:70, 3:] = np.nan
+    valid = ~np.isnan(r)
+    masks = [rng.random(n) < q for n, q in [(0, 0.5), (1, 0.5), (50, 0.0), (50, 1.0), (500, 0.7), (500, 0.3)]]
+
+    kernels = [
+        ("autocorr lag 1", _autocorr_rows, (r, valid, 1)),
+        ("autocorr lag 2", _autocorr_rows, (r, valid, 2)),
+        ("kurtosis", _kurtosis_rows, (r, valid)),
+    ] + [(f"longest_run n={len(m)}", _longest_run, (m,)) for m in masks]
+
+    for name, kernel, args in kernels:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            expected = kernel.numpy_impl(*args)
+        check(f"{name} loop kernel", expected, kernel.loop_impl(*args))
+        if jit_available():
+            check(f"{name} compiled", expected, jit_compile(kernel.loop_impl)(*args))
+
+    if jit_available():
+        check("recurrence compiled", ref, linear_recurrence_jit(a, b, x0=0.3), exact=True)
+    else:
+        print("numba not installed: compiled kernels not checked")
+
+
+def check_numpy_scorer(rng: np.random.Generator):
+    """
+    NumPy scorer (fused scaler + encoder) vs scaler.transform + Keras encoder.predict.
+
+    Skipped when TensorFlow / scikit-learn are not installed.
+    """
+    try:
+        from sklearn.preprocessing import StandardScaler
+        from src.model.autoencoder import PriceAutoencoder
+    except ImportError:
+        print("tensorflow / scikit-learn not installed: NumPy scorer not checked")
+        return
+
+    X = (rng.lognormal(-3.0, 1.0, (5000, 5)) * rng.uniform(0.1, 10.0, 5)).astype(np.float32)
+    X[:100, 1] = X[0, 1]    # a near-constant stretch
+    scaler = StandardScaler().fit(X)
+    ae = PriceAutoencoder(input_dim=5, latent_dim=2, hidden_dims=(16, 8), latent_activation=None)
+    ae(X[:1])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        scorer = NumpyScorer.load(export_bundle(Path(tmp) / "encoder.npz", scaler, ae.encoder, FEATURES_5))
+    expected = ae.encoder.predict(scaler.transform(X).astype(np.float32), batch_size=1024, verbose=0)
+    check("numpy scorer vs keras encoder", expected, scorer.encode(X, batch_size=1500), rtol=1e-4, atol=1e-5)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"JIT backend {'enabled' if jit_enabled() else 'disabled'}")
+    check_recurrence(rng)
+    check_dgp_paths(rng)
+    check_jit_kernels(rng)
+    check_numpy_scorer(rng)
+    print("All parity checks passed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
-import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
 
 def plot_market_plotly(df: pd.DataFrame, market_id: int = 0):
+    import plotly.graph_objects as go   # only the plots need plotly
+
     d = df[df["market_id"] == market_id].copy()
     d = d.sort_values("t")
 
@@ -16,4 +16,29 @@ def summarize_window_states(S_window: np.ndarray) -> dict:
         "share_K": float(shares[2]),
         "state_mode": mode_state,         # 0=C, 1=T, 2=K
         "is_pure_80": float(shares[mode_state] >= 0.80) if mode_state >= 0 else 0.0,
-    }
\ No newline at end of file
+    }
+
+def summarize_windows_states(S: np.ndarray, starts: np.ndarray, window: int) -> dict:
+    """
+    Vectorized summarize_window_states for many windows of one state series.
+
+    S is the concatenated state series and starts the start position of each window
+    (all of length `window`). Counts come from cumulative per-state counts, so the
+    cost is O(len(S) + n_windows) whatever the window length. Returns column arrays.
+    """
+    one_hot = np.zeros((len(S) + 1, 3), dtype=np.int64)
+    one_hot[np.arange(1, len(S) + 1), S.astype(int)] = 1
+    cum = np.cumsum(one_hot, axis=0)
+
+    counts = cum[starts + window] - cum[starts]
+    shares = counts / window
+    mode_state = np.argmax(counts, axis=1)
+    mode_share = shares[np.arange(len(starts)), mode_state]
+
+    return {
+        "share_C": shares[:, 0],
+        "share_T": shares[:, 1],
+        "share_K": shares[:, 2],
+        "state_mode": mode_state,                       # 0=C, 1=T, 2=K
+        "is_pure_80": (mode_share >= 0.80).astype(float),
+    }
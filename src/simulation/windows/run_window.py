@@ -8,32 +8,60 @@ while PROJECT_ROOT != PROJECT_ROOT.parent and not (PROJECT_ROOT / "src").exists(
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.append(str(PROJECT_ROOT))
     
-from src.simulation.windows.windows import make_windows_multi, make_windows
+from src.simulation.windows.windows import make_windows_lengths
 from src.utils.paths import run_dir
 from src.utils.config import load_tier0_config
+from src.utils.schema import DtypePolicy, apply_dtype_policy, dtype_policy_from_config
+
+def build_windows(
+    base: Path, w: int, policy: DtypePolicy, df: pd.DataFrame | None = None, layout: str = "wide"
+) -> Path:
+    """Write windows_L{w}.parquet for one run folder; df is the series if already loaded."""
+    return build_windows_lengths(base, (w,), policy, df=df, layout=layout)[w]
+
+
+def build_windows_lengths(
+    base: Path, lengths, policy: DtypePolicy, df: pd.DataFrame | None = None, layout: str = "wide"
+) -> dict:
+    """
+    Write windows_L{w}.parquet for every length in one pass over the series.
+
+    layout="wide" stores Price 1..Price L columns; layout="index" stores only the
+    window's start row in the series (prices are rebuilt by read_windows).
+    """
+    if layout not in ("wide", "index"):
+        raise ValueError(f"Unknown windows layout: {layout}")
+
+    # read series from the run folder
+    if df is None:
+        df = pd.read_parquet(base / "data" / "series.parquet")
+
+    # write windows next to it
+    win_dir = base / "data" / "windows"
+    win_dir.mkdir(parents=True, exist_ok=True)
+
+    outs = {}
+    for w, win_df in make_windows_lengths(df, lengths, include_prices=(layout == "wide")).items():
+        out = win_dir / f"windows_L{w}.parquet"
+        apply_dtype_policy(win_df, policy).to_parquet(out, index=False)
+        outs[w] = out
+    return outs
+
 
 def main():
     _, raw_cfg = load_tier0_config("configs/dgp0.yaml")
     seed = raw_cfg["simulation"]["seed"]
+    policy = dtype_policy_from_config(raw_cfg)
+    layout = raw_cfg.get("windows", {}).get("layout", "wide")
 
     experiment = "dgp0"
 
     for mode in ["baseline", "kappa_only", "beta_only", "calm_fundamentals", "trend_fundamentals"]:
         base = run_dir(experiment, seed, mode)
 
-        # read series from the run folder
-        df = pd.read_parquet(base / "data" / "series.parquet")
-
-        # write windows next to it
-        win_dir = base / "data" / "windows"
-        win_dir.mkdir(parents=True, exist_ok=True)
-
-        for w in (18, 24, 36):
-            win_df = make_windows(df, window=w)
-            out = win_dir / f"windows_L{w}.parquet"
-            win_df.to_parquet(out, index=False)
+        outs = build_windows_lengths(base, (18, 24, 36), policy, layout=layout)
 
-        print(f"Saved windows for {mode} in {win_dir}")
+        print(f"Saved windows for {mode} in {outs[18].parent}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
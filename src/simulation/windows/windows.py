@@ -10,8 +10,74 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.append(str(PROJECT_ROOT))
 import pandas as pd
 import numpy as np
-from typing import Iterable, List
-from src.simulation.windows.labels import summarize_window_states
+import pyarrow.dataset as ds
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, Iterable, Iterator, List
+from src.simulation.windows.labels import summarize_windows_states
+
+
+SERIES_ROW_COL = "series_row"
+
+
+def _sorted_panel(df, price_col, state_col, id_col, time_col) -> dict:
+    """
+    Sort the panel once and precompute what every window length needs: the column
+    arrays and, for each row, the last row of its market.
+    """
+    required = {id_col, time_col, price_col, state_col}
+    missing = required - set(df.columns)
+    if missing:
+        raise ValueError(f"Missing columns: {missing}")
+
+    df = df.sort_values([id_col, time_col])
+
+    ids = df[id_col].to_numpy()
+    n = len(df)
+    new_market = np.ones(n, dtype=bool)
+    new_market[1:] = ids[1:] != ids[:-1]
+    market_start = np.flatnonzero(new_market)
+    market_end = np.append(market_start[1:], n)   # exclusive
+
+    return dict(
+        ids=ids,
+        times=df[time_col].to_numpy(),
+        p=df[price_col].to_numpy(),
+        S=df[state_col].to_numpy(),
+        last_row=np.repeat(market_end, market_end - market_start) - 1,
+    )
+
+
+def _windows_from_sorted(panel: dict, window: int, id_col: str, include_prices: bool) -> pd.DataFrame:
+    n = len(panel["ids"])
+
+    # left-aligned windows start ... start+window-1 must stay inside one market:
+    # a start is valid when the market's last row is at least window-1 rows ahead
+    starts = np.flatnonzero(np.arange(n) + window - 1 <= panel["last_row"])
+
+    if len(starts) == 0:
+        return pd.DataFrame()
+
+    times = panel["times"]
+    out = {
+        id_col: panel["ids"][starts],
+        "window_start": times[starts].astype(int),
+        "window_end": times[starts + window - 1].astype(int),
+        "window_length": np.full(len(starts), int(window)),
+    }
+
+    if include_prices:
+        # strided (zero-copy) view over all length-`window` slices; only valid ones are gathered
+        p_win = sliding_window_view(panel["p"], window)[starts]
+        # price columns: Price 1..Price L
+        out.update({f"Price {j}": p_win[:, j - 1] for j in range(1, window + 1)})
+    else:
+        # index layout: prices are rebuilt from the series at read time (see expand_windows)
+        out[SERIES_ROW_COL] = starts
+
+    # add regime summary labels (diagnostics)
+    out.update(summarize_windows_states(panel["S"], starts, window))
+
+    return pd.DataFrame(out)
 
 
 def make_windows(
@@ -21,6 +87,7 @@ def make_windows(
     state_col: str = "S",
     id_col: str = "market_id",
     time_col: str = "t",
+    include_prices: bool = True,
 ) -> pd.DataFrame:
     """
     Convert a long market panel into a row-per-window dataset.
@@ -29,60 +96,123 @@ def make_windows(
       - market_id, t, p, S (and optionally c)
     Output:
       - market_id, window_start, window_end, window_length
-      - Price 1..Price L
+      - Price 1..Price L (or, with include_prices=False, `series_row`: the window's
+        first row in the panel sorted by market and time)
       - share_C/T/K, state_mode, is_pure_80 (for diagnostics)
     """
-    required = {id_col, time_col, price_col, state_col}
-    missing = required - set(df.columns)
-    if missing:
-        raise ValueError(f"Missing columns: {missing}")
+    return make_windows_lengths(
+        df, (window,), price_col=price_col, state_col=state_col,
+        id_col=id_col, time_col=time_col, include_prices=include_prices,
+    )[window]
 
-    df = df.sort_values([id_col, time_col]).copy()
 
-    rows = []
+def make_windows_lengths(
+    df: pd.DataFrame,
+    windows: Iterable[int] = (18, 24, 36),
+    price_col: str = "p",
+    state_col: str = "S",
+    id_col: str = "market_id",
+    time_col: str = "t",
+    include_prices: bool = True,
+) -> Dict[int, pd.DataFrame]:
+    """
+    Windows for several lengths from a single sort and scan of the panel.
 
-    for market_id, g in df.groupby(id_col, sort=False):
-        g = g.sort_values(time_col)
-        p = g[price_col].to_numpy()
-        S = g[state_col].to_numpy()
+    Returns {L: make_windows(df, L)}.
+    """
+    panel = _sorted_panel(df, price_col, state_col, id_col, time_col)
+    return {w: _windows_from_sorted(panel, w, id_col, include_prices) for w in windows}
 
-        T = len(g)
-        if T < window:
-            continue
 
-        # left-aligned windows: start ... start+window-1
-        for start in range(0, T - window + 1):
-            end = start + window - 1
+def make_windows_multi(
+    df: pd.DataFrame,
+    windows: Iterable[int] = (18, 24, 36),
+    **kwargs
+) -> pd.DataFrame:
+    """Stack windows for multiple window lengths into one DataFrame."""
+    out = list(make_windows_lengths(df, windows, **kwargs).values())
+    return pd.concat(out, ignore_index=True) if out else pd.DataFrame()
 
-            p_win = p[start:start + window]
-            S_win = S[start:start + window]
 
-            row = {
-                id_col: market_id,
-                "window_start": int(g[time_col].iloc[start]),
-                "window_end": int(g[time_col].iloc[end]),
-                "window_length": int(window),
-            }
+def sorted_prices(
+    series: pd.DataFrame, price_col: str = "p", id_col: str = "market_id", time_col: str = "t"
+) -> np.ndarray:
+    """Prices in (market, time) order, the array that index-layout series_row values point into."""
+    return series.sort_values([id_col, time_col])[price_col].to_numpy()
 
-            # price columns: Price 1..Price L
-            for j, val in enumerate(p_win, start=1):
-                row[f"Price {j}"] = float(val)
 
-            # add regime summary labels (diagnostics)
-            row.update(summarize_window_states(S_win))
+def window_prices(
+    series: pd.DataFrame,
+    rows: np.ndarray,
+    window: int,
+    price_col: str = "p",
+    id_col: str = "market_id",
+    time_col: str = "t",
+) -> np.ndarray:
+    """
+    (n_windows, window) prices for index-layout windows starting at `rows`.
 
-            rows.append(row)
+    The windows are a strided view over the sorted price series; only the gather by
+    `rows` allocates.
+    """
+    return sliding_window_view(sorted_prices(series, price_col, id_col, time_col), window)[rows]
 
-    return pd.DataFrame(rows)
 
+def _expand_with_prices(index_df: pd.DataFrame, p: np.ndarray) -> pd.DataFrame:
+    if index_df.empty:
+        return index_df
 
-def make_windows_multi(
-    df: pd.DataFrame,
-    windows: Iterable[int] = (18, 24, 36),
-    **kwargs
-) -> pd.DataFrame:
-    """Stack windows for multiple window lengths into one DataFrame."""
-    out = []
-    for w in windows:
-        out.append(make_windows(df, window=w, **kwargs))
-    return pd.concat(out, ignore_index=True) if out else pd.DataFrame()
\ No newline at end of file
+    window = int(index_df["window_length"].iloc[0])
+    p_win = sliding_window_view(p, window)[index_df[SERIES_ROW_COL].to_numpy()]
+
+    meta = index_df.drop(columns=SERIES_ROW_COL)
+    head = meta.columns.get_loc("window_length") + 1
+    prices = pd.DataFrame(p_win, columns=[f"Price {j}" for j in range(1, window + 1)], index=meta.index)
+    return pd.concat([meta.iloc[:, :head], prices, meta.iloc[:, head:]], axis=1)
+
+
+def expand_windows(index_df: pd.DataFrame, series: pd.DataFrame, **kwargs) -> pd.DataFrame:
+    """Rebuild the wide Price 1..Price L layout from index-layout windows and their series."""
+    if index_df.empty:
+        return index_df
+    return _expand_with_prices(index_df, sorted_prices(series, **kwargs))
+
+
+def read_windows(path: Path, series_path: Path) -> pd.DataFrame:
+    """
+    Read a windows file in either layout and return the wide Price 1..Price L frame.
+
+    Index-layout files (no price columns) are expanded from the series they were
+    built from.
+    """
+    df = pd.read_parquet(path)
+    if SERIES_ROW_COL in df.columns:
+        series = pd.read_parquet(series_path)
+        df = expand_windows(df, series)
+    return df
+
+
+def iter_windows(path: Path, series_path: Path, batch_size: int = 65_536) -> Iterator[pd.DataFrame]:
+    """
+    Read a windows file in record batches of at most `batch_size` rows, each returned
+    as a wide Price 1..Price L frame.
+
+    Only one batch of windows is materialized at a time. Index-layout files are
+    expanded from the sorted price column of the series, which is read once.
+    An empty file yields a single empty frame with the file's columns.
+    """
+    dataset = ds.dataset(path, format="parquet")
+    p = None
+    if SERIES_ROW_COL in dataset.schema.names:
+        p = sorted_prices(pd.read_parquet(series_path, columns=["market_id", "t", "p"]))
+
+    empty = True
+    for batch in dataset.to_batches(batch_size=batch_size):
+        if batch.num_rows == 0:
+            continue
+        empty = False
+        df = batch.to_pandas()
+        yield df if p is None else _expand_with_prices(df, p)
+
+    if empty:
+        yield dataset.schema.empty_table().to_pandas()
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import functools
+import importlib.util
+import os
+from typing import Callable
+
+# Single switch for the accelerated backend: "auto" (default) compiles the loop
+# kernels with Numba when it is installed, "0" forces NumPy, "1" requires Numba.
+JIT_ENV = "COLLUSION_JIT"
+
+_override: bool | None = None
+_compiled: dict = {}
+
+
+@functools.lru_cache(maxsize=None)
+def jit_available() -> bool:
+    # numba itself is imported on first compile only; minimal environments run the NumPy kernels
+    return importlib.util.find_spec("numba") is not None
+
+
+def use_jit(enabled: bool | None) -> None:
+    """Force the backend on or off for this process; None goes back to the environment switch."""
+    global _override
+    if enabled and not jit_available():
+        raise ImportError("use_jit(True) requires numba (pip install 'detecting-collusion[jit]')")
+    _override = enabled
+
+
+def jit_enabled() -> bool:
+    """Whether kernels should run their compiled loop implementation."""
+    if _override is not None:
+        return _override
+    setting = os.environ.get(JIT_ENV, "auto").strip().lower()
+    if setting in ("auto", ""):
+        return jit_available()
+    if setting in ("0", "off", "false", "numpy"):
+        return False
+    if setting in ("1", "on", "true", "numba"):
+        if not jit_available():
+            raise ImportError(f"{JIT_ENV}={setting} requires numba (pip install 'detecting-collusion[jit]')")
+        return True
+    raise ValueError(f"Unknown {JIT_ENV} value '{setting}', expected auto, 0 or 1")
+
+
+def jit_compile(loop_impl: Callable) -> Callable:
+    """
+    Numba-compiled version of a plain-loop kernel (compiled once, on first use).
+
+    Kernels are compiled with nogil so chunks can be featurized on a thread pool.
+    """
+    if loop_impl not in _compiled:
+        import numba
+        _compiled[loop_impl] = numba.njit(cache=True, nogil=True)(loop_impl)
+    return _compiled[loop_impl]
+
+
+def jit_kernel(loop_impl: Callable) -> Callable:
+    """
+    Decorator pairing a NumPy kernel with a loop implementation of the same signature.
+
+    Calls go to the compiled loop when jit_enabled() and to the decorated NumPy
+    function otherwise; both stay reachable as `.numpy_impl` / `.loop_impl` for the
+    parity checks. The loop sums sequentially where NumPy sums pairwise, so the two
+    agree to floating point tolerance (run_parity.RTOL), not bit for bit.
+    """
+    def wrap(numpy_impl: Callable) -> Callable:
+        @functools.wraps(numpy_impl)
+        def kernel(*args):
+            if jit_enabled():
+                return jit_compile(loop_impl)(*args)
+            return numpy_impl(*args)
+
+        kernel.numpy_impl = numpy_impl
+        kernel.loop_impl = loop_impl
+        return kernel
+
+    return wrap
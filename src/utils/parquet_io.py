@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import shutil
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+class ParquetStreamWriter:
+    """
+    Append DataFrame chunks to one Parquet file, one row group per chunk.
+
+    The schema is taken from the first chunk; later chunks are cast to it. Only the
+    chunk being written is held in memory, so peak memory is set by the chunk size
+    rather than by the size of the file.
+
+        with ParquetStreamWriter(path) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+    """
+
+    def __init__(self, path: Path, compression: str = "snappy"):
+        self.path = Path(path)
+        self.compression = compression
+        self.rows = 0
+        self._writer: Optional[pq.ParquetWriter] = None
+        self._schema: Optional[pa.Schema] = None
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self._writer is None:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            self._schema = table.schema
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._writer = pq.ParquetWriter(self.path, self._schema, compression=self.compression)
+        else:
+            table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+
+        self._writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self) -> "ParquetStreamWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def write_dataset_part(df: pd.DataFrame, directory: Path, reset: bool = False) -> Path:
+    """
+    Add df as the next part-NNNNN.parquet file of a directory dataset.
+
+    pd.read_parquet(directory) reads all parts as one table. reset=True first removes
+    the existing dataset (a directory, or a single file at the same path).
+    """
+    directory = Path(directory)
+    if reset and directory.is_dir():
+        shutil.rmtree(directory)
+    elif reset and directory.exists():
+        directory.unlink()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    n = len(list(directory.glob("part-*.parquet")))
+    path = directory / f"part-{n:05d}.parquet"
+    df.to_parquet(path, index=False)
+    return path
+
+
+def map_chunks(fn: Callable, chunks: Iterable, workers: int = 1, processes: bool = False) -> Iterator:
+    """
+    Yield fn(chunk) for every chunk, in input order.
+
+    With workers > 1 the calls run on a thread pool (the NumPy and compiled kernels
+    release the GIL), or on a process pool with processes=True (fn and the chunks
+    must then be picklable). At most 2 * workers chunks are pulled from `chunks`
+    ahead of the consumer, so memory stays bounded by the chunk size.
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield fn(chunk)
+        return
+
+    executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with executor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(fn, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
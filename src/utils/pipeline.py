@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
+MANIFEST_SUFFIX = ".manifest.json"
+
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    """Content hash of a file, read in chunks."""
+    h = hashlib.sha256()
+    with Path(path).open("rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def manifest_path(artifact: Path) -> Path:
+    """Manifest location for an artifact: next to it, as <name>.manifest.json."""
+    artifact = Path(artifact)
+    return artifact.with_name(artifact.name + MANIFEST_SUFFIX)
+
+
+def read_manifest(artifact: Path) -> dict | None:
+    path = manifest_path(artifact)
+    if not path.exists():
+        return None
+    with path.open("r") as fh:
+        return json.load(fh)
+
+
+def artifact_hash(path: Path) -> str:
+    """
+    Content hash of an artifact.
+
+    Reuses the hash recorded in the artifact's manifest while its size and mtime are
+    unchanged, so large upstream files are not re-read on every run.
+    """
+    path = Path(path)
+    stat = path.stat()
+    manifest = read_manifest(path)
+    if manifest and manifest.get("size") == stat.st_size and manifest.get("mtime_ns") == stat.st_mtime_ns:
+        return manifest["sha256"]
+    return file_sha256(path)
+
+
+@dataclass
+class Stage:
+    """
+    One node of the artifact DAG.
+
+    The stage key hashes the stage name, its config section, the content of its
+    input artifacts and the source of the modules in `code`. A stage is skipped when
+    every output exists with a manifest recording the same key.
+    """
+    name: str
+    run: Callable[[], object]
+    outputs: List[Path]
+    inputs: List[Path] = field(default_factory=list)
+    config: dict = field(default_factory=dict)
+    code: List[str] = field(default_factory=list)   # source files relative to the project root
+
+    def key(self) -> str:
+        payload = {
+            "stage": self.name,
+            "config": self.config,
+            "inputs": {str(p): artifact_hash(p) for p in self.inputs},
+            "code": {f: file_sha256(PROJECT_ROOT / f) for f in self.code},
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def is_fresh(self, key: str) -> bool:
+        for out in self.outputs:
+            manifest = read_manifest(out) if Path(out).exists() else None
+            if manifest is None or manifest.get("key") != key:
+                return False
+        return True
+
+    def write_manifests(self, key: str) -> None:
+        for out in self.outputs:
+            out = Path(out)
+            stat = out.stat()
+            manifest = {
+                "stage": self.name,
+                "key": key,
+                "sha256": file_sha256(out),
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "inputs": {str(p): artifact_hash(p) for p in self.inputs},
+                "config": self.config,
+                "code": self.code,
+            }
+            with manifest_path(out).open("w") as fh:
+                json.dump(manifest, fh, indent=2, default=str)
+
+
+def topological_order(stages: List[Stage]) -> List[Stage]:
+    """Order stages so every producer of an artifact runs before its consumers."""
+    producer: Dict[str, Stage] = {}
+    for stage in stages:
+        for out in stage.outputs:
+            if str(out) in producer:
+                raise ValueError(f"Artifact {out} is produced by both {producer[str(out)].name} and {stage.name}")
+            producer[str(out)] = stage
+
+    ordered, state = [], {}
+
+    def visit(stage: Stage):
+        if state.get(stage.name) == "done":
+            return
+        if state.get(stage.name) == "active":
+            raise ValueError(f"Cycle in pipeline at stage {stage.name}")
+        state[stage.name] = "active"
+        for inp in stage.inputs:
+            if str(inp) in producer:
+                visit(producer[str(inp)])
+        state[stage.name] = "done"
+        ordered.append(stage)
+
+    for stage in stages:
+        visit(stage)
+    return ordered
+
+
+def run_pipeline(stages: List[Stage], force: bool = False, dry_run: bool = False) -> List[str]:
+    """
+    Run the DAG, skipping every stage whose outputs are current for its key.
+
+    An upstream stage that reruns but reproduces byte-identical outputs leaves its
+    consumers' keys unchanged, so they are skipped as well. With dry_run, nothing is
+    executed; a stage whose inputs do not exist yet is reported as stale along with
+    everything downstream. Returns the names of the stages that ran (or would run).
+    """
+    ran = []
+    pending_outputs = set()
+
+    for stage in topological_order(stages):
+        if dry_run and any(str(p) in pending_outputs or not Path(p).exists() for p in stage.inputs):
+            print(f"[stale] {stage.name}")
+            ran.append(stage.name)
+            pending_outputs.update(str(p) for p in stage.outputs)
+            continue
+
+        key = stage.key()
+        if not force and stage.is_fresh(key):
+            print(f"[skip]  {stage.name}")
+            continue
+
+        ran.append(stage.name)
+        if dry_run:
+            print(f"[stale] {stage.name}")
+            pending_outputs.update(str(p) for p in stage.outputs)
+            continue
+
+        print(f"[run]   {stage.name}")
+        stage.run()
+        missing = [str(p) for p in stage.outputs if not Path(p).exists()]
+        if missing:
+            raise RuntimeError(f"Stage {stage.name} did not produce: {missing}")
+        stage.write_manifests(key)
+
+    return ran
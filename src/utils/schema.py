@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+import pandas as pd
+
+# Column roles shared by panels, windows, features and scores (synthetic and real)
+ID_COLS = ("market_id",)
+TIME_COLS = ("t", "window_start", "window_end", "window_length")
+INDEX_COLS = ("Window",)     # real-data window index, unbounded by the simulation horizon
+STATE_COLS = ("S", "state_mode", "is_pure_80")
+NAME_COLS = ("Name",)
+
+
+@dataclass
+class DtypePolicy:
+    """
+    Storage dtypes applied to every pipeline table before it is written.
+
+    None keeps whatever dtype pandas produced (the default for every field); the
+    `dtypes` section of the config switches to the compact schema.
+    """
+    id_dtype: Optional[str] = None      # market ids
+    time_dtype: Optional[str] = None    # t, window bounds/length; floor for the real-data window index
+    state_dtype: Optional[str] = None   # regime, modal regime, purity flag
+    float_dtype: Optional[str] = None   # prices, costs, shares, features, latent codes
+    categorical_names: bool = False     # real-data product names
+
+
+def dtype_policy_from_config(raw_cfg: dict) -> DtypePolicy:
+    """Build the DtypePolicy from the optional `dtypes` section of the raw config."""
+    return DtypePolicy(**raw_cfg.get("dtypes", {}))
+
+
+def _cast_int(df: pd.DataFrame, col: str, dtype: str) -> None:
+    info = np.iinfo(dtype)
+    values = df[col]
+    if len(values) and (values.min() < info.min or values.max() > info.max):
+        raise ValueError(
+            f"Column '{col}' spans [{values.min()}, {values.max()}], which does not fit {dtype}; "
+            "widen it in the `dtypes` config section"
+        )
+    df[col] = values.astype(dtype)
+
+
+def _fitting_int(values: pd.Series, dtype: str) -> str:
+    """`dtype`, or the narrowest wider signed integer dtype that holds values."""
+    for candidate in (dtype, "int32", "int64"):
+        info = np.iinfo(candidate)
+        if np.dtype(candidate).itemsize >= np.dtype(dtype).itemsize and (
+            not len(values) or (values.min() >= info.min and values.max() <= info.max)
+        ):
+            return candidate
+    return "int64"
+
+
+def apply_dtype_policy(df: pd.DataFrame, policy: DtypePolicy) -> pd.DataFrame:
+    """
+    Cast the known columns of df to the policy dtypes (in place) and return df.
+
+    Integer casts are range checked, so a policy too narrow for the data raises
+    instead of silently wrapping around. The real-data window index has no bound
+    known in advance, so it takes time_dtype or the next wider dtype that fits.
+    """
+    int_roles = ((ID_COLS, policy.id_dtype), (TIME_COLS, policy.time_dtype), (STATE_COLS, policy.state_dtype))
+    for cols, dtype in int_roles:
+        if dtype is None:
+            continue
+        for col in cols:
+            if col in df.columns and df[col].dtype != dtype:
+                _cast_int(df, col, dtype)
+
+    if policy.time_dtype is not None:
+        for col in INDEX_COLS:
+            if col in df.columns:
+                dtype = _fitting_int(df[col], policy.time_dtype)
+                if df[col].dtype != dtype:
+                    df[col] = df[col].astype(dtype)
+
+    if policy.float_dtype is not None:
+        float_cols = [
+            c for c in df.select_dtypes(include="floating").columns
+            if c not in STATE_COLS and df[c].dtype != policy.float_dtype
+        ]
+        if float_cols:
+            df[float_cols] = df[float_cols].astype(policy.float_dtype)
+
+    if policy.categorical_names:
+        for col in NAME_COLS:
+            if col in df.columns:
+                df[col] = df[col].astype("category")
+
+    return df